@@ -13,6 +13,9 @@ import seaborn as sns
 import simpy
 from tqdm import tqdm
 
+from src.utils.early_stop import aborted_cost, run_until
+from src.utils.instrumentation import SimStats
+
 
 def KIX_T1a_covid(
     path: str,
@@ -51,6 +54,9 @@ def KIX_T1a_covid(
     save_xls: bool = False,
     call_n_iter: int = None,
     totalpbar=None,
+    stats: SimStats = None,
+    seed: int = 12,
+    stop_condition=None,
 ):
     """Simulate a day of KIX T1 arrival with covid process
 
@@ -91,6 +97,9 @@ def KIX_T1a_covid(
         save_xls (bool, optional): [description]. Defaults to False.
         call_n_iter (int, optional): [description]. Defaults to None.
         totalpbar ([type], optional): [description]. Defaults to None.
+        stats (SimStats, optional): filled with run statistics, see utils.instrumentation. Defaults to None.
+        seed (int, optional): seed of the Pax types draws, the same seed gives the same draws whatever the capacities and processing times, not the ratios of Pax types (see simfunc.compare). Defaults to 12.
+        stop_condition (optional): function (env, arrival, df_result) -> bool checked during the run, the run stops as soon as it is True and df_result.attrs["aborted"] is the stop time, see utils.early_stop. Defaults to None (full run).
 
     Returns:
         (
@@ -100,7 +109,10 @@ def KIX_T1a_covid(
         dct_hist_queue_length: dictionnary of 'system': [list of queue length for each pax]
     )
     """
-    random.seed(12)  # for reproductibility and smooth optimization
+    if stats is not None:
+        stats.start()
+
+    random.seed(seed)  # for reproductibility and smooth optimization
 
     # change units of Pt
     Pt_Z = Pt_Z / 60
@@ -138,6 +150,9 @@ def KIX_T1a_covid(
     FREQ = freq
     WINDOW = win
 
+    if stats is not None:
+        stats.lap("input_prep")
+
     """
     KIX T1 Int'l arrival
     """
@@ -712,7 +727,10 @@ def KIX_T1a_covid(
     df_result = pd.DataFrame(dct_result)
 
     # Create an environment and start the setup process
-    env = simpy.Environment(initial_time=0)
+    if stats is None:
+        env = simpy.Environment(initial_time=0)
+    else:
+        env = stats.environment(initial_time=0)
     arrival = arrival_creator(
         env,
         list_airlines,
@@ -756,9 +774,14 @@ def KIX_T1a_covid(
         )
         index_total += len(df_Pax_flight["minutes"])
 
+    if stats is not None:
+        stats.track(arrival)
+        stats.lap("generator_setup")
+
     # Execute!
     end_time = 1600
 
+    aborted = None
     if show_loading == True:
         if call_n_iter is not None and totalpbar is not None:
             with tqdm(
@@ -768,6 +791,11 @@ def KIX_T1a_covid(
                     env.run(until=i)
                     runpbar.update(1)
                     totalpbar.update(1)
+                    if stop_condition is not None and stop_condition(
+                        env, arrival, df_result
+                    ):
+                        aborted = env.now
+                        break
         else:
             with tqdm(
                 total=end_time - 1, desc="Simulation running..."
@@ -775,9 +803,23 @@ def KIX_T1a_covid(
                 for i in range(1, end_time):
                     env.run(until=i)
                     runpbar.update(1)
+                    if stop_condition is not None and stop_condition(
+                        env, arrival, df_result
+                    ):
+                        aborted = env.now
+                        break
 
     else:
-        env.run(until=1600)
+        aborted = run_until(
+            env, 1600, stop_condition, arrival, df_result
+        )
+
+    if stats is not None:
+        stats.lap("env_run")
+
+    if aborted is not None:
+        # Pax who had not showed up when the run stopped are not simulated
+        df_result = df_result[df_result["Pax_ID"].notna()].copy()
 
     # ======================================= Results formatting =======================================
 
@@ -956,6 +998,9 @@ def KIX_T1a_covid(
         for key in [*dct_plot]
     }
 
+    if stats is not None:
+        stats.lap("formatting")
+
     # ======================================= Plotting =======================================
     n_graph = len([*dct_plot])
     if show_graph == True:
@@ -1038,6 +1083,9 @@ def KIX_T1a_covid(
         if save_graph == True:
             plt.savefig(path + "/KIX_T1_dep.jpg")
 
+    if stats is not None:
+        stats.lap("plotting")
+
     # set parameters in a DataFrame
     # maybe there is a more elegant way to do that
     dct_param_run = {
@@ -1093,6 +1141,9 @@ def KIX_T1a_covid(
 
         writer.save()
 
+    if stats is not None:
+        stats.lap("saving")
+
     list_kpi_queue_length = [
         list(plt_queue_length[i]["max"].replace(np.nan, 0))
         for i in range(n_graph)
@@ -1122,6 +1173,11 @@ def KIX_T1a_covid(
         [kpi_queue_length[i], kpi_wait_time[i]] for i in range(n_graph)
     ]
 
+    if stats is not None:
+        stats.lap("kpi")
+
+    df_result.attrs["aborted"] = aborted
+
     return (
         df_result,
         list_KPI_run,
@@ -1167,12 +1223,16 @@ def univariate_cost_function_generator_T1a_covid_N(
 
         # run the model and get the wait_time and queue_length dicts
         (
-            _,
+            df_result,
             _,
             dct_hist_wait_time,
             dct_hist_queue_length,
         ) = KIX_T1a_covid(**dct_param_T1a)
 
+        # run stopped early by a stop_condition in the parameters
+        if df_result.attrs["aborted"] is not None:
+            return aborted_cost(target_wait_time, df_result.attrs["aborted"])
+
         # caculate cost
         cost_wait_time_run = (
             dct_hist_wait_time[system_string].quantile(q=0.90)
@@ -7,6 +7,7 @@ import datetime
 import heapq
 import os
 import random
+from functools import partial
 
 import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
@@ -16,6 +17,10 @@ import seaborn as sns
 import simpy
 from tqdm import tqdm
 
+from src.simfunc.isolated import isolated_T1d, record_stream, station_T1d
+from src.utils.early_stop import aborted_cost, run_until
+from src.utils.instrumentation import SimStats
+
 
 def KIX_T1d(
     path: str,
@@ -44,6 +49,10 @@ def KIX_T1d(
     save_xls: bool = False,
     call_n_iter: int = None,
     totalpbar=None,
+    stats: SimStats = None,
+    origin: str = None,
+    seed: int = 12,
+    stop_condition=None,
 ):
     """[summary]
 
@@ -74,6 +83,10 @@ def KIX_T1d(
         save_xls (bool, optional): [description]. Defaults to False.
         call_n_iter (int, optional): [description]. Defaults to None.
         totalpbar ([type], optional): [description]. Defaults to None.
+        stats (SimStats, optional): filled with run statistics, see utils.instrumentation. Defaults to None.
+        origin (str, optional): midnight of the continuous time base (eg. "2017-03-01") of a multi-day df_Pax with absolute times and df_Counters from origin, see simfunc.horizon. Defaults to None (one folded day).
+        seed (int, optional): seed of the Pax types draws, the same seed gives the same draws whatever the capacities and processing times, not the ratios of Pax types (see simfunc.compare). Defaults to 12.
+        stop_condition (optional): function (env, departure, df_result) -> bool checked during the run, the run stops as soon as it is True and df_result.attrs["aborted"] is the stop time, see utils.early_stop. Defaults to None (full run).
 
     Returns:
         (
@@ -83,7 +96,10 @@ def KIX_T1d(
         dct_hist_queue_length: dictionnary of 'system': [list of queue length for each pax]
     )
     """
-    random.seed(12)  # for reproductibility and smooth optimization
+    if stats is not None:
+        stats.start()
+
+    random.seed(seed)  # for reproductibility and smooth optimization
 
     # change units of Pt
     Pt_checkin_1step_counter = Pt_checkin_1step_counter / 60
@@ -109,11 +125,17 @@ def KIX_T1d(
     list_flight = df_Pax["Flight Number"].unique()
     list_airlines = [string for string in df_Pax["airline"].unique()]
 
-    df_Pax["minutes"] = (
-        df_Pax["time"].dt.hour.astype(int) * 60
-        + df_Pax["time"].dt.minute.astype(int)
-        + df_Pax["time"].dt.second.astype(int) / 60
-    )
+    if origin is None:
+        df_Pax["minutes"] = (
+            df_Pax["time"].dt.hour.astype(int) * 60
+            + df_Pax["time"].dt.minute.astype(int)
+            + df_Pax["time"].dt.second.astype(int) / 60
+        )
+    else:
+        # continuous time base: minutes since origin, over several days
+        df_Pax["minutes"] = (
+            df_Pax["time"] - pd.Timestamp(origin)
+        ).dt.total_seconds() / 60
     df_Pax = df_Pax.sort_values(["minutes"]).reset_index(drop=True)
 
     data_orig = df_Counters.copy()
@@ -125,6 +147,9 @@ def KIX_T1d(
     FREQ = freq
     WINDOW = win
 
+    if stats is not None:
+        stats.lap("input_prep")
+
     """
     KIX T1 Int'l departure
     """
@@ -183,12 +208,12 @@ def KIX_T1d(
         def wait_opening(self, Pax):
             """wait for an openned counter"""
             opened_counters = data.loc[
-                int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
             ]
             while opened_counters < 1:
                 yield self.env.timeout(5)
                 opened_counters = data.loc[
-                    int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                    int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
                 ]
 
         def checkin_1step_counter(self, Pax):
@@ -197,12 +222,12 @@ def KIX_T1d(
             we should flag him as 'missed flight at check-in'
             right now we just let them wait until reopening."""
             opened_counters = data.loc[
-                int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
             ]
             while opened_counters < 1:
                 yield self.env.timeout(5)
                 opened_counters = data.loc[
-                    int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                    int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
                 ]
             test_time = Pt_checkin_1step_counter / opened_counters
             yield self.env.timeout(test_time)
@@ -210,7 +235,7 @@ def KIX_T1d(
         def checkin_1step_dummy(self, Pax):
             """dummy process to have the good processing time for each checkin operation"""
             opened_counters = data.loc[
-                int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
             ]
             test_time2 = Pt_checkin_1step_counter - (
                 Pt_checkin_1step_counter / opened_counters
@@ -222,12 +247,12 @@ def KIX_T1d(
         def checkin_2step_counter(self, Pax):
             """same as 1-step process but shorter"""
             opened_counters = data.loc[
-                int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
             ]
             while opened_counters < 1:
                 yield self.env.timeout(5)
                 opened_counters = data.loc[
-                    int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                    int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
                 ]
             test_time = Pt_checkin_2step_counter / opened_counters
             yield self.env.timeout(test_time)
@@ -235,7 +260,7 @@ def KIX_T1d(
         def checkin_2step_dummy(self, Pax):
             """dummy process to have the good processing time for each checkin operation"""
             opened_counters = data.loc[
-                int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
             ]
             test_time3 = Pt_checkin_1step_counter - (
                 Pt_checkin_2step_counter / opened_counters
@@ -638,7 +663,10 @@ def KIX_T1d(
     df_result = pd.DataFrame(dct_result)
 
     # Create an environment and start the setup process
-    env = simpy.Environment(initial_time=0)
+    if stats is None:
+        env = simpy.Environment(initial_time=0)
+    else:
+        env = stats.environment(initial_time=0)
     departure = departure_creator(
         env,
         list_airlines,
@@ -656,6 +684,8 @@ def KIX_T1d(
     # Generate the Pax
 
     index_total = 0
+    # Scheduled Time of each Pax, by the index of its Pax_ID
+    list_STD = []
 
     for flight in list_flight:
         # global df_Pax_flight
@@ -668,10 +698,18 @@ def KIX_T1d(
             Pax_generator(env, departure, flight, df_Pax_flight, index_total)
         )
         index_total += len(df_Pax_flight["minutes"])
+        list_STD.append(df_Pax_flight["Scheduled Time"])
+
+    if stats is not None:
+        stats.track(departure)
+        stats.lap("generator_setup")
 
     # Execute!
     end_time = 1441
+    if origin is not None:
+        end_time = max(end_time, int(df_Pax["minutes"].max()) + 2)
 
+    aborted = None
     if show_loading == True:
         if call_n_iter is not None and totalpbar is not None:
             with tqdm(
@@ -681,6 +719,11 @@ def KIX_T1d(
                     env.run(until=i)
                     runpbar.update(1)
                     totalpbar.update(1)
+                    if stop_condition is not None and stop_condition(
+                        env, departure, df_result
+                    ):
+                        aborted = env.now
+                        break
         else:
             with tqdm(
                 total=end_time - 1, desc="Simulation running..."
@@ -688,9 +731,23 @@ def KIX_T1d(
                 for i in range(1, end_time):
                     env.run(until=i)
                     runpbar.update(1)
+                    if stop_condition is not None and stop_condition(
+                        env, departure, df_result
+                    ):
+                        aborted = env.now
+                        break
 
     else:
-        env.run(until=1500)
+        aborted = run_until(
+            env, end_time + 59, stop_condition, departure, df_result
+        )
+
+    if stats is not None:
+        stats.lap("env_run")
+
+    if aborted is not None:
+        # Pax who had not showed up when the run stopped are not simulated
+        df_result = df_result[df_result["Pax_ID"].notna()].copy()
 
     # ======================================= Results formatting =======================================
 
@@ -719,6 +776,10 @@ def KIX_T1d(
     def minutes_to_hms(minutes):
         if np.isnan(minutes):
             hms = np.nan
+        elif origin is not None:
+            hms = pd.Timestamp(origin) + pd.Timedelta(
+                seconds=np.floor(minutes * 60)
+            )
         else:
             hms = "{0:s} {1:0=2d}:{2:0=2d}:{3:0=2d}".format(
                 "2020-10-13",
@@ -741,19 +802,26 @@ def KIX_T1d(
     )
     # add "STD" eventually, this may be done inside the simulation as we will use STD
     # to determine who has missed his flight and flag them as such
-    df_result = (
-        pd.merge(
-            df_result,
-            df_Pax.drop_duplicates("Flight Number")[
-                ["Flight Number", "Scheduled Time"]
-            ],
-            left_on="flight_number",
-            right_on="Flight Number",
-            how="left",
+    if origin is None:
+        df_result = (
+            pd.merge(
+                df_result,
+                df_Pax.drop_duplicates("Flight Number")[
+                    ["Flight Number", "Scheduled Time"]
+                ],
+                left_on="flight_number",
+                right_on="Flight Number",
+                how="left",
+            )
+            .drop(columns="Flight Number")
+            .rename(columns={"Scheduled Time": "STD"})
+        )
+    else:
+        # a flight number comes back every date of a multi-day df_Pax:
+        # STD of each Pax, the rows of df_result being the Pax indexes
+        df_result["STD"] = pd.concat(list_STD, ignore_index=True).where(
+            df_result["Pax_ID"].notna()
         )
-        .drop(columns="Flight Number")
-        .rename(columns={"Scheduled Time": "STD"})
-    )
 
     # Create waiting times
     df_result["wait_time_checkin_kiosk"] = (
@@ -938,12 +1006,18 @@ def KIX_T1d(
         for key in [*dct_plot]
     }
 
+    if stats is not None:
+        stats.lap("formatting")
+
     # ======================================= Plotting =======================================
     n_graph = len([*dct_plot])
     if show_graph == True:
         # plot param
         xmin = pd.to_datetime("2020-10-13 00:00:00")
         xmax = pd.to_datetime("2020-10-14 00:00:00")
+        if origin is not None:
+            xmin = pd.Timestamp(origin)
+            xmax = xmin + pd.Timedelta(days=int(np.ceil(end_time / 1440)))
         plt.rcParams.update({"figure.autolayout": True})
         hours = mdates.HourLocator(interval=1)
         half_hours = mdates.MinuteLocator(byminute=[0, 30], interval=1)
@@ -1050,6 +1124,9 @@ def KIX_T1d(
         if save_graph == True:
             plt.savefig(path + "/KIX_T1_dep.jpg")
 
+    if stats is not None:
+        stats.lap("plotting")
+
     # set parameters in a DataFrame
     # maybe there is a more elegant way to do that
     dct_param_run = {
@@ -1094,6 +1171,9 @@ def KIX_T1d(
 
         writer.save()
 
+    if stats is not None:
+        stats.lap("saving")
+
     list_kpi_queue_length = [
         list(plt_queue_length[i]["max"].replace(np.nan, 0))
         for i in range(n_graph)
@@ -1123,6 +1203,11 @@ def KIX_T1d(
         [kpi_queue_length[i], kpi_wait_time[i]] for i in range(n_graph)
     ]
 
+    if stats is not None:
+        stats.lap("kpi")
+
+    df_result.attrs["aborted"] = aborted
+
     return (
         df_result,
         list_KPI_run,
@@ -1137,6 +1222,7 @@ def univariate_cost_function_generator_T1d_N(
     dct_param_T1d,  # includes df_Pax and df_Counters
     call_n_iter=None,
     totalpbar=None,
+    isolated=False,  # simulate only the station of the variable and after it
 ):
     """
     this function generates a univariate cost function for T1 departure
@@ -1146,7 +1232,18 @@ def univariate_cost_function_generator_T1d_N(
     => after we should also make the following possible:
         - traffic (easy)
         - areas
+
+    with isolated=True (N_security_lanes, N_emigration_counter or N_emigration_self),
+    the Pax arriving at the station are recorded in one full run and each
+    evaluation simulates only that station and the ones after it (see simfunc.isolated)
     """
+    if isolated:
+        df_stream = record_stream(
+            KIX_T1d, dct_param_T1d, station_T1d(variable_string)
+        )
+        model = partial(isolated_T1d, df_stream)
+    else:
+        model = KIX_T1d
 
     def cost_function_T1d_covid_N(
         x,  # value of variable for which cost function should be evaluated
@@ -1169,11 +1266,15 @@ def univariate_cost_function_generator_T1d_N(
 
         # run the model and get the wait_time and queue_length dicts
         (
-            _,
+            df_result,
             _,
             dct_hist_wait_time,
             dct_hist_queue_length,
-        ) = KIX_T1d(**dct_param_T1d)
+        ) = model(**dct_param_T1d)
+
+        # run stopped early by a stop_condition in the parameters
+        if df_result.attrs["aborted"] is not None:
+            return aborted_cost(target_wait_time, df_result.attrs["aborted"])
 
         # caculate cost for specific variable
         cost_wait_time_run = (
@@ -17,11 +17,10 @@ import seaborn as sns
 import simpy
 from tqdm import tqdm
 from math import ceil
-from src.utils.profiles import show_up_function
+from src.utils.profiles import counter_schedule
 from src.utils.helpers import calculate_EBS_LBC, calculate_EBS_modern_pax_only
-
-from src.utils.profiles import show_up_function
-from src.utils.helpers import calculate_EBS_LBC
+from src.utils.early_stop import aborted_cost, run_until
+from src.utils.instrumentation import SimStats
 
 
 def KIX_T1d_CUSBD(
@@ -53,6 +52,10 @@ def KIX_T1d_CUSBD(
     save_xls: bool = False,
     call_n_iter: int = None,
     totalpbar=None,
+    stats: SimStats = None,
+    origin: str = None,
+    seed: int = 12,
+    stop_condition=None,
 ):
     """Simulate a day of KIX T1 departure with Common Use Self Bag Drop area
 
@@ -84,6 +87,10 @@ def KIX_T1d_CUSBD(
         save_xls (bool, optional): [description]. Defaults to False.
         call_n_iter (int, optional): [description]. Defaults to None.
         totalpbar ([type], optional): [description]. Defaults to None.
+        stats (SimStats, optional): filled with run statistics, see utils.instrumentation. Defaults to None.
+        origin (str, optional): midnight of the continuous time base (eg. "2017-03-01") of a multi-day df_Pax with absolute times and df_Counters from origin, see simfunc.horizon. Defaults to None (one folded day).
+        seed (int, optional): seed of the Pax types draws, the same seed gives the same draws whatever the capacities and processing times, not the ratios of Pax types (see simfunc.compare). Defaults to 12.
+        stop_condition (optional): function (env, departure, df_result) -> bool checked during the run, the run stops as soon as it is True and df_result.attrs["aborted"] is the stop time, see utils.early_stop. Defaults to None (full run).
 
     Returns:
         (
@@ -93,7 +100,10 @@ def KIX_T1d_CUSBD(
         dct_hist_queue_length: dictionnary of 'system': [list of queue length for each pax]
     )
     """
-    random.seed(12)  # for reproductibility and smooth optimization
+    if stats is not None:
+        stats.start()
+
+    random.seed(seed)  # for reproductibility and smooth optimization
 
     # change units of Pt
     Pt_checkin_1step_counter = Pt_checkin_1step_counter / 60
@@ -119,11 +129,17 @@ def KIX_T1d_CUSBD(
     list_flight = df_Pax["Flight Number"].unique()
     list_airlines = [string for string in df_Pax["airline"].unique()]
 
-    df_Pax["minutes"] = (
-        df_Pax["time"].dt.hour.astype(int) * 60
-        + df_Pax["time"].dt.minute.astype(int)
-        + df_Pax["time"].dt.second.astype(int) / 60
-    )
+    if origin is None:
+        df_Pax["minutes"] = (
+            df_Pax["time"].dt.hour.astype(int) * 60
+            + df_Pax["time"].dt.minute.astype(int)
+            + df_Pax["time"].dt.second.astype(int) / 60
+        )
+    else:
+        # continuous time base: minutes since origin, over several days
+        df_Pax["minutes"] = (
+            df_Pax["time"] - pd.Timestamp(origin)
+        ).dt.total_seconds() / 60
     df_Pax = df_Pax.sort_values(["minutes"]).reset_index(drop=True)
 
     data_orig = df_Counters.copy()
@@ -135,6 +151,9 @@ def KIX_T1d_CUSBD(
     FREQ = freq
     WINDOW = win
 
+    if stats is not None:
+        stats.lap("input_prep")
+
     """
     KIX T1 Int'l departure
     """
@@ -203,12 +222,12 @@ def KIX_T1d_CUSBD(
         def wait_opening(self, Pax):
             """wait for a normal counter to be openned"""
             opened_counters = data.loc[
-                int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
             ]
             while opened_counters < 1:
                 yield self.env.timeout(5)
                 opened_counters = data.loc[
-                    int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                    int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
                 ]
 
         def wait_CUSBD_opening(self, Pax):
@@ -233,12 +252,12 @@ def KIX_T1d_CUSBD(
             we should flag him as 'missed flight at check-in'
             right now we just let them wait until reopening."""
             opened_counters = data.loc[
-                int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
             ]
             while opened_counters < 1:
                 yield self.env.timeout(5)
                 opened_counters = data.loc[
-                    int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                    int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
                 ]
             test_time = Pt_checkin_1step_counter / opened_counters
             yield self.env.timeout(test_time)
@@ -246,7 +265,7 @@ def KIX_T1d_CUSBD(
         def checkin_1step_dummy(self, Pax):
             """dummy process to have the good processing time for each checkin operation"""
             opened_counters = data.loc[
-                int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
             ]
             test_time2 = Pt_checkin_1step_counter - (
                 Pt_checkin_1step_counter / opened_counters
@@ -258,12 +277,12 @@ def KIX_T1d_CUSBD(
         def checkin_2step_counter(self, Pax):
             """same as 1-step process but shorter"""
             opened_counters = data.loc[
-                int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
             ]
             while opened_counters < 1:
                 yield self.env.timeout(5)
                 opened_counters = data.loc[
-                    int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                    int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
                 ]
             test_time = Pt_checkin_2step_counter / opened_counters
             yield self.env.timeout(test_time)
@@ -271,7 +290,7 @@ def KIX_T1d_CUSBD(
         def checkin_2step_dummy(self, Pax):
             """dummy process to have the good processing time for each checkin operation"""
             opened_counters = data.loc[
-                int(env.now / 5) % 288, Pax.split("_")[2].split()[0]
+                int(env.now / 5) % len(data), Pax.split("_")[2].split()[0]
             ]
             test_time3 = Pt_checkin_1step_counter - (
                 Pt_checkin_2step_counter / opened_counters
@@ -701,7 +720,10 @@ def KIX_T1d_CUSBD(
     df_result = pd.DataFrame(dct_result)
 
     # Create an environment and start the setup process
-    env = simpy.Environment(initial_time=0)
+    if stats is None:
+        env = simpy.Environment(initial_time=0)
+    else:
+        env = stats.environment(initial_time=0)
     departure = departure_creator(
         env,
         list_airlines,
@@ -735,9 +757,16 @@ def KIX_T1d_CUSBD(
         )
         index_total += len(df_Pax_flight["minutes"])
 
+    if stats is not None:
+        stats.track(departure)
+        stats.lap("generator_setup")
+
     # Execute!
     end_time = 1441
+    if origin is not None:
+        end_time = max(end_time, int(df_Pax["minutes"].max()) + 2)
 
+    aborted = None
     if show_loading == True:
         if call_n_iter is not None and totalpbar is not None:
             with tqdm(
@@ -747,6 +776,11 @@ def KIX_T1d_CUSBD(
                     env.run(until=i)
                     runpbar.update(1)
                     totalpbar.update(1)
+                    if stop_condition is not None and stop_condition(
+                        env, departure, df_result
+                    ):
+                        aborted = env.now
+                        break
         else:
             with tqdm(
                 total=end_time - 1, desc="Simulation running..."
@@ -754,9 +788,23 @@ def KIX_T1d_CUSBD(
                 for i in range(1, end_time):
                     env.run(until=i)
                     runpbar.update(1)
+                    if stop_condition is not None and stop_condition(
+                        env, departure, df_result
+                    ):
+                        aborted = env.now
+                        break
 
     else:
-        env.run(until=1500)
+        aborted = run_until(
+            env, end_time + 59, stop_condition, departure, df_result
+        )
+
+    if stats is not None:
+        stats.lap("env_run")
+
+    if aborted is not None:
+        # Pax who had not showed up when the run stopped are not simulated
+        df_result = df_result[df_result["Pax_ID"].notna()].copy()
 
     # ======================================= Results formatting =======================================
 
@@ -789,6 +837,10 @@ def KIX_T1d_CUSBD(
     def minutes_to_hms(minutes):
         if np.isnan(minutes):
             hms = np.nan
+        elif origin is not None:
+            hms = pd.Timestamp(origin) + pd.Timedelta(
+                seconds=np.floor(minutes * 60)
+            )
         else:
             hms = "{0:s} {1:0=2d}:{2:0=2d}:{3:0=2d}".format(
                 "2020-10-13",
@@ -1011,12 +1063,18 @@ def KIX_T1d_CUSBD(
         for key in [*dct_plot]
     }
 
+    if stats is not None:
+        stats.lap("formatting")
+
     # ======================================= Plotting =======================================
     n_graph = len([*dct_plot])
     if show_graph == True:
         # plot param
         xmin = pd.to_datetime("2020-10-13 00:00:00")
         xmax = pd.to_datetime("2020-10-14 00:00:00")
+        if origin is not None:
+            xmin = pd.Timestamp(origin)
+            xmax = xmin + pd.Timedelta(days=int(np.ceil(end_time / 1440)))
         plt.rcParams.update({"figure.autolayout": True})
         hours = mdates.HourLocator(interval=1)
         half_hours = mdates.MinuteLocator(byminute=[0, 30], interval=1)
@@ -1123,6 +1181,9 @@ def KIX_T1d_CUSBD(
         if save_graph == True:
             plt.savefig(path + "/KIX_T1_dep.jpg")
 
+    if stats is not None:
+        stats.lap("plotting")
+
     # set parameters in a DataFrame
     # maybe there is a more elegant way to do that
     dct_param_run = {
@@ -1169,6 +1230,9 @@ def KIX_T1d_CUSBD(
 
         writer.save()
 
+    if stats is not None:
+        stats.lap("saving")
+
     list_kpi_queue_length = [
         list(plt_queue_length[i]["max"].replace(np.nan, 0))
         for i in range(n_graph)
@@ -1198,6 +1262,11 @@ def KIX_T1d_CUSBD(
         [kpi_queue_length[i], kpi_wait_time[i]] for i in range(n_graph)
     ]
 
+    if stats is not None:
+        stats.lap("kpi")
+
+    df_result.attrs["aborted"] = aborted
+
     return (
         df_result,
         list_KPI_run,
@@ -1244,12 +1313,16 @@ def univariate_cost_function_generator_T1d_CUSBD_N(
 
         # run the model and get the wait_time and queue_length dicts
         (
-            _,
+            df_result,
             _,
             dct_hist_wait_time,
             dct_hist_queue_length,
         ) = KIX_T1d_CUSBD(**dct_param_T1d)
 
+        # run stopped early by a stop_condition in the parameters
+        if df_result.attrs["aborted"] is not None:
+            return aborted_cost(target_wait_time, df_result.attrs["aborted"])
+
         # caculate cost
         cost_wait_time_run = (
             dct_hist_wait_time[system_string].quantile(q=0.90)
@@ -1305,17 +1378,11 @@ def cost_function_T1d_CUSBD_modern_pax_ratio(
         "seats_per_add_counter": ceil(110 / (1 - two_step_ratio)),
     }
 
-    # generate df_Counter (only)
-    df_Counters = show_up_function(
-        target_peak=target_peak,
-        direction="D",
-        system="check-in",
-        ratio=1,
-        terminal="T1",
-        CTG_type="A",
-        custom_showup=False,
-        custom_counter_rule=custom_counter_rule,
-        **kwargs,
+    # generate df_Counter (only), from the counters cached for each rule
+    if custom_counter_rule == False:
+        kwargs_rule = {}
+    df_Counters = counter_schedule(target_peak=target_peak, terminal="T1")(
+        **kwargs_rule
     )
 
     dct_param_T1d["df_Counters"] = df_Counters
@@ -1425,17 +1492,11 @@ def cost_function_T1d_CUSBD_2var_modern_pax_ratio_CUSBD_opening_duration(
         "seats_per_add_counter": ceil(110 / (1 - two_step_ratio)),
     }
 
-    # generate df_Counter (only)
-    df_Counters = show_up_function(
-        target_peak=target_peak,
-        direction="D",
-        system="check-in",
-        ratio=1,
-        terminal="T1",
-        CTG_type="A",
-        custom_showup=False,
-        custom_counter_rule=custom_counter_rule,
-        **kwargs_rule,
+    # generate df_Counter (only), from the counters cached for each rule
+    if custom_counter_rule == False:
+        kwargs_rule = {}
+    df_Counters = counter_schedule(target_peak=target_peak, terminal="T1")(
+        **kwargs_rule
     )
 
     dct_param_T1d["df_Counters"] = df_Counters
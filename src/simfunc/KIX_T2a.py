@@ -12,6 +12,8 @@ import seaborn as sns
 import heapq
 from tqdm import tqdm
 
+from src.utils.early_stop import run_until
+
 
 def KIX_T2_arrival_sim_function(
     path,
@@ -41,12 +43,27 @@ def KIX_T2_arrival_sim_function(
     save_xls=False,
     call_n_iter=None,
     totalpbar=None,
+    stats=None,
+    origin=None,
+    seed=12,
+    stop_condition=None,
 ):
     """
     Function corresponding to one run of the simulation for KIX T2 arr int.
     returns df_result, list_KPI_run
+    stats: optional SimStats filled with run statistics (see utils.instrumentation)
+    origin: midnight of the continuous time base of a multi-day df_Pax
+    with absolute times (see simfunc.horizon), None for one folded day
+    seed: seed of the Pax types draws, the same for the same ratios of Pax
+    types whatever the capacities (see simfunc.compare)
+    stop_condition: function (env, arrival, df_result) -> bool, the run
+    stops as soon as it is True and df_result.attrs["aborted"] is the
+    stop time (see utils.early_stop), None for a full run
     """
-    random.seed(12)  # for reproductibility and smooth optimization
+    if stats is not None:
+        stats.start()
+
+    random.seed(seed)  # for reproductibility and smooth optimization
     # debugging
     global df_result
     global key
@@ -75,16 +92,25 @@ def KIX_T2_arrival_sim_function(
     list_flight = df_Pax["Flight Number"].unique()
     list_airlines = [string for string in df_Pax["airline"].unique()]
 
-    df_Pax["minutes"] = (
-        df_Pax["time"].dt.hour.astype(int) * 60
-        + df_Pax["time"].dt.minute.astype(int)
-        + df_Pax["time"].dt.second.astype(int) / 60
-    )
+    if origin is None:
+        df_Pax["minutes"] = (
+            df_Pax["time"].dt.hour.astype(int) * 60
+            + df_Pax["time"].dt.minute.astype(int)
+            + df_Pax["time"].dt.second.astype(int) / 60
+        )
+    else:
+        # continuous time base: minutes since origin, over several days
+        df_Pax["minutes"] = (
+            df_Pax["time"] - pd.Timestamp(origin)
+        ).dt.total_seconds() / 60
     df_Pax = df_Pax.sort_values(["minutes"]).reset_index(drop=True)
 
     FREQ = freq
     WINDOW = win
 
+    if stats is not None:
+        stats.lap("input_prep")
+
     """
     KIX T2 Int'l arrival
     """
@@ -500,7 +526,10 @@ def KIX_T2_arrival_sim_function(
     df_result = pd.DataFrame(dct_result)
 
     # Create an environment and start the setup process
-    env = simpy.Environment(initial_time=0)
+    if stats is None:
+        env = simpy.Environment(initial_time=0)
+    else:
+        env = stats.environment(initial_time=0)
     arrival = arrival_creator(
         env,
     )
@@ -508,6 +537,8 @@ def KIX_T2_arrival_sim_function(
     # Generate the Pax
 
     index_total = 0
+    # Scheduled Time of each Pax, by the index of its Pax_ID
+    list_STD = []
 
     for flight in list_flight:
         # global df_Pax_flight
@@ -520,10 +551,18 @@ def KIX_T2_arrival_sim_function(
             Pax_generator(env, arrival, flight, df_Pax_flight, index_total)
         )
         index_total += len(df_Pax_flight["minutes"])
+        list_STD.append(df_Pax_flight["Scheduled Time"])
+
+    if stats is not None:
+        stats.track(arrival)
+        stats.lap("generator_setup")
 
     # Execute!
     end_time = 1441
+    if origin is not None:
+        end_time = max(end_time, int(df_Pax["minutes"].max()) + 2)
 
+    aborted = None
     if show_loading == True:
         if call_n_iter is not None and totalpbar is not None:
             with tqdm(
@@ -533,6 +572,11 @@ def KIX_T2_arrival_sim_function(
                     env.run(until=i)
                     runpbar.update(1)
                     totalpbar.update(1)
+                    if stop_condition is not None and stop_condition(
+                        env, arrival, df_result
+                    ):
+                        aborted = env.now
+                        break
         else:
             with tqdm(
                 total=end_time - 1, desc="Simulation running..."
@@ -540,9 +584,23 @@ def KIX_T2_arrival_sim_function(
                 for i in range(1, end_time):
                     env.run(until=i)
                     runpbar.update(1)
+                    if stop_condition is not None and stop_condition(
+                        env, arrival, df_result
+                    ):
+                        aborted = env.now
+                        break
 
     else:
-        env.run(until=1500)
+        aborted = run_until(
+            env, end_time + 59, stop_condition, arrival, df_result
+        )
+
+    if stats is not None:
+        stats.lap("env_run")
+
+    if aborted is not None:
+        # Pax who had not showed up when the run stopped are not simulated
+        df_result = df_result[df_result["Pax_ID"].notna()].copy()
 
     # ======================================= Results formatting =======================================
 
@@ -573,6 +631,10 @@ def KIX_T2_arrival_sim_function(
     def minutes_to_hms(minutes):
         if np.isnan(minutes):
             hms = np.nan
+        elif origin is not None:
+            hms = pd.Timestamp(origin) + pd.Timedelta(
+                seconds=np.floor(minutes * 60)
+            )
         else:
             hms = "{0:s} {1:0=2d}:{2:0=2d}:{3:0=2d}".format(
                 "2020-10-13",
@@ -595,30 +657,37 @@ def KIX_T2_arrival_sim_function(
     )
     # add "STD" eventually, this may be done inside the simulation as we will use STD
     # to determine who has missed his flight and flag them as such
-    df_result = (
-        pd.merge(
-            df_result,
-            df_Pax.drop_duplicates("Flight Number")[
-                ["Flight Number", "Scheduled Time"]
-            ],
-            left_on="flight_number",
-            right_on="Flight Number",
-            how="left",
+    if origin is None:
+        df_result = (
+            pd.merge(
+                df_result,
+                df_Pax.drop_duplicates("Flight Number")[
+                    ["Flight Number", "Scheduled Time"]
+                ],
+                left_on="flight_number",
+                right_on="Flight Number",
+                how="left",
+            )
+            .drop(columns="Flight Number")
+            .rename(columns={"Scheduled Time": "STD"})
+        )
+    else:
+        # a flight number comes back every date of a multi-day df_Pax:
+        # STD of each Pax, the rows of df_result being the Pax indexes
+        df_result["STD"] = pd.concat(list_STD, ignore_index=True).where(
+            df_result["Pax_ID"].notna()
         )
-        .drop(columns="Flight Number")
-        .rename(columns={"Scheduled Time": "STD"})
-    )
 
     # 2 fake guys to prevent bug
     if all(pd.isnull(df_result["start_customs_self_queue"])):
         df_result.loc[0:1, "start_customs_self_queue"] = pd.to_datetime(
-            "2020-10-13 00:00:01"
+            minutes_to_hms(1 / 60)
         )
         df_result.loc[0:1, "end_customs_self_queue"] = pd.to_datetime(
-            "2020-10-13 00:00:01"
+            minutes_to_hms(1 / 60)
         )
         df_result.loc[0:1, "end_customs_self_process"] = pd.to_datetime(
-            "2020-10-13 00:00:01"
+            minutes_to_hms(1 / 60)
         )
         df_result.loc[0:1, "customs_self_queue_length"] = 0
 
@@ -801,12 +870,18 @@ def KIX_T2_arrival_sim_function(
         for key in [*dct_plot]
     }
 
+    if stats is not None:
+        stats.lap("formatting")
+
     # ======================================= Plotting =======================================
     n_graph = len([*dct_plot])
     if show_graph == True:
         # plot param
         xmin = pd.to_datetime("2020-10-13 00:00:00")
         xmax = pd.to_datetime("2020-10-14 00:00:00")
+        if origin is not None:
+            xmin = pd.Timestamp(origin)
+            xmax = xmin + pd.Timedelta(days=int(np.ceil(end_time / 1440)))
         plt.rcParams.update({"figure.autolayout": True})
         hours = mdates.HourLocator(interval=1)
         half_hours = mdates.MinuteLocator(byminute=[0, 30], interval=1)
@@ -883,6 +958,9 @@ def KIX_T2_arrival_sim_function(
         if save_graph == True:
             plt.savefig(path + "/KIX_T2_arr.jpg")
 
+    if stats is not None:
+        stats.lap("plotting")
+
     # set parameters in a DataFrame
     # maybe there is a more elegant way to do that
     dct_param_run = {
@@ -928,6 +1006,9 @@ def KIX_T2_arrival_sim_function(
 
         writer.save()
 
+    if stats is not None:
+        stats.lap("saving")
+
     list_kpi_queue_length = [
         list(plt_queue_length[i]["max"].replace(np.nan, 0))
         for i in range(n_graph)
@@ -957,6 +1038,11 @@ def KIX_T2_arrival_sim_function(
         [kpi_queue_length[i], kpi_wait_time[i]] for i in range(n_graph)
     ]
 
+    if stats is not None:
+        stats.lap("kpi")
+
+    df_result.attrs["aborted"] = aborted
+
     return (
         df_result,
         list_KPI_run,
@@ -0,0 +1,535 @@
+# KIX_airport.py
+# includes:
+# - KIX_airport <- several terminal flows (eg. T1/T2 departure and arrival)
+#   in one engine run, with shared staff pools and transfers
+# - flow_T1d, flow_T1a <- flows with the stations, paths and priorities
+#   of KIX_T1d / KIX_T1a
+
+import numpy as np
+import pandas as pd
+import simpy
+
+from src.utils.instrumentation import SimStats
+
+
+def flow_T1d(
+    df_Pax,
+    df_Counters,
+    Pt_checkin_1step_counter,
+    Pt_checkin_2step_counter,
+    Pt_kiosk,
+    Pt_security_lanes,
+    Pt_emigration_counter,
+    Pt_emigration_self,
+    modern_pax_ratio,
+    digital_pax_ratio,
+    premium_pax_ratio,
+    security="T1_security_lanes",
+    emigration_counter="T1_emigration_counter",
+    emigration_self="T1_emigration_self",
+    kiosk="T1_kiosk",
+):
+    """
+    flow of KIX T1 departures for KIX_airport (processing times in SECONDS)
+    the arguments security, emigration_counter... name the resources used,
+    give the same name to several flows to share a resource or staff pool
+    traditional Pax: check-in counter, security, emigration counter
+    modern and digital Pax: kiosk, check-in (2 step), security,
+    emigration self
+    premium Pax: as traditional, with priority at check-in and security
+    """
+    traditional_pax_ratio = (
+        1 - modern_pax_ratio - digital_pax_ratio - premium_pax_ratio
+    )
+    return {
+        "df_Pax": df_Pax,
+        "df_Counters": df_Counters,
+        "stations": {
+            "checkin_1step": ("checkin", Pt_checkin_1step_counter),
+            "checkin_2step": ("checkin", Pt_checkin_2step_counter),
+            "kiosk": (kiosk, Pt_kiosk),
+            "security_lanes": (security, Pt_security_lanes),
+            "emigration_counter": (emigration_counter, Pt_emigration_counter),
+            "emigration_self": (emigration_self, Pt_emigration_self),
+        },
+        "paths": [
+            (
+                traditional_pax_ratio,
+                ["checkin_1step", "security_lanes", "emigration_counter"],
+            ),
+            (
+                modern_pax_ratio,
+                [
+                    "kiosk",
+                    "checkin_2step",
+                    "security_lanes",
+                    "emigration_self",
+                ],
+            ),
+            (
+                digital_pax_ratio,
+                [
+                    "kiosk",
+                    "checkin_2step",
+                    "security_lanes",
+                    "emigration_self",
+                ],
+            ),
+            (
+                premium_pax_ratio,
+                ["checkin_1step", "security_lanes", "emigration_counter"],
+                1,
+                ["checkin_1step", "security_lanes"],
+            ),
+        ],
+        # Pt of the check-in counter process including the dummy machine
+        "Pt_checkin_total": Pt_checkin_1step_counter,
+    }
+
+
+def flow_T1a(
+    df_Pax,
+    Pt_quarantine,
+    Pt_immigration_counter,
+    Pt_immigration_self,
+    Wt_bag_claim,
+    Pt_customs_counter,
+    Pt_customs_self,
+    traditional_pax_ratio,
+    no_bag_pax_ratio,
+    quarantine="T1_quarantine",
+    immigration_counter="T1_immigration_counter",
+    immigration_self="T1_immigration_self",
+    customs_counter="T1_customs_counter",
+    customs_self="T1_customs_self",
+):
+    """
+    flow of KIX T1 arrivals for KIX_airport (processing times in SECONDS,
+    Wt_bag_claim in MINUTES as KIX_T1a)
+    traditional Pax: quarantine, immigration counter, bag claim,
+    customs counter; the others use the self lanes, without bag claim
+    for no_bag Pax
+    """
+    self_pax_ratio = 1 - traditional_pax_ratio - no_bag_pax_ratio
+    return {
+        "df_Pax": df_Pax,
+        "stations": {
+            "quarantine": (quarantine, Pt_quarantine),
+            "immigration_counter": (
+                immigration_counter,
+                Pt_immigration_counter,
+            ),
+            "immigration_self": (immigration_self, Pt_immigration_self),
+            "bag_claim": (None, Wt_bag_claim * 60),
+            "customs_counter": (customs_counter, Pt_customs_counter),
+            "customs_self": (customs_self, Pt_customs_self),
+        },
+        "paths": [
+            (
+                traditional_pax_ratio,
+                [
+                    "quarantine",
+                    "immigration_counter",
+                    "bag_claim",
+                    "customs_counter",
+                ],
+            ),
+            (
+                self_pax_ratio,
+                [
+                    "quarantine",
+                    "immigration_self",
+                    "bag_claim",
+                    "customs_self",
+                ],
+            ),
+            (
+                no_bag_pax_ratio,
+                ["quarantine", "immigration_self", "customs_self"],
+            ),
+        ],
+    }
+
+
+def KIX_airport(
+    dct_flow: dict,
+    dct_resource: dict,
+    transfers: list = None,
+    seed: int = 12,
+    service_time_cv: float = 0,
+    origin: str = None,
+    stats: SimStats = None,
+):
+    """
+    one simulation run of several terminal flows sharing one engine
+
+    dct_flow: {flow name: flow}, each flow being a dict (see flow_T1d):
+        - "df_Pax": Pax generated by utils.profiles (or simfunc.horizon)
+        - "df_Counters": check-in counters, for flows with check-in
+        - "stations": {station: (resource name, processing time [s])};
+          the resource "checkin" is the check-in counters of the airline
+          of each Pax, None is a wait without queue (eg. bag claim)
+        - "paths": [(ratio of the Pax, [stations in order])], with an
+          optional third item, the priority of the Pax (default 2,
+          1 goes first as premium Pax), and an optional fourth item, the
+          stations where this priority applies (default all the stations
+          of the path); the queues of the resources without priority
+          are first come first served, as in the models
+    dct_resource: {resource name: capacity}; stations of different flows
+    using the same resource share it, eg. one pool of officers for
+    emigration and immigration, or one security zone for T1 and T2
+    transfers: [(from flow, to flow, ratio, station, transfer time [min])]
+    a ratio of the Pax of `from flow` skip its stations and join the
+    paths of `to flow` at `station` after the transfer time
+    seed: seed of the random draws, one stream per decision (Pax types
+    of each flow, transfers, service times): with the same seed, each Pax
+    gets the same draws whatever the capacities, ratios or other flows,
+    for common random numbers comparisons (see simfunc.compare)
+    service_time_cv: coefficient of variation of the service times
+    (gamma distributed around the Pt), 0 for constant service times
+    origin: continuous time base, see KIX_T1d
+
+    the events are recorded in arrays, not in DataFrames,
+    which keeps one combined run cheaper than the separate models
+    returns (
+        dct_result: {flow: DataFrame of results for each Pax},
+        dct_hist_wait_time: {flow: {station: wait time [min] of each Pax}},
+    )
+    """
+    if stats is not None:
+        stats.start()
+
+    # ======================================= Inputs =======================================
+    dct_input = {}
+    for flow_number, (name, flow) in enumerate(dct_flow.items()):
+        df_Pax = flow["df_Pax"].copy()
+        if origin is None:
+            minutes = (
+                df_Pax["time"].dt.hour * 60
+                + df_Pax["time"].dt.minute
+                + df_Pax["time"].dt.second / 60
+            ).to_numpy(dtype=float)
+        else:
+            minutes = (
+                df_Pax["time"] - pd.Timestamp(origin)
+            ).dt.total_seconds().to_numpy() / 60
+        order = np.argsort(minutes, kind="mergesort")
+        df_Pax = df_Pax.iloc[order].reset_index(drop=True)
+
+        dct_input[name] = {
+            "df_Pax": df_Pax,
+            "minutes": minutes[order],
+            "airline": df_Pax["Flight Number"].str.split().str[0].to_numpy(),
+            "path": _draw_paths(
+                _stream(seed, "path", flow_number).random(len(df_Pax)),
+                flow["paths"],
+            ),
+            "transfer": np.full(len(df_Pax), -1),
+            "flow_number": flow_number,
+        }
+
+    # transfers: the Pax leaving a flow are added to the destination flow
+    for transfer_number, (
+        from_flow,
+        to_flow,
+        ratio,
+        station,
+        transfer_time,
+    ) in enumerate(transfers or []):
+        source = dct_input[from_flow]
+        destination = dct_input[to_flow]
+        stream = _stream(seed, "transfer", transfer_number)
+        u_transfer, u_path = stream.random((2, len(source["df_Pax"])))
+        mask = (source["transfer"] < 0) & (u_transfer < ratio)
+        source["transfer"][mask] = len(destination["df_Pax"]) + np.arange(
+            mask.sum()
+        )
+        for path in dct_flow[to_flow]["paths"]:
+            if station not in path[1] and path[0] > 0:
+                raise ValueError(
+                    "transfer station {} not in all paths of {}".format(
+                        station, to_flow
+                    )
+                )
+        destination.setdefault("join", {})
+        for k in range(mask.sum()):
+            destination["join"][len(destination["df_Pax"]) + k] = station
+        df_transfer = source["df_Pax"][mask].assign(transfer=from_flow)
+        destination["df_Pax"] = pd.concat(
+            [destination["df_Pax"], df_transfer], ignore_index=True
+        )
+        destination["airline"] = np.concatenate(
+            [destination["airline"], source["airline"][mask]]
+        )
+        destination["minutes"] = np.concatenate(
+            [destination["minutes"], source["minutes"][mask] + transfer_time]
+        )
+        destination["path"] = np.concatenate(
+            [
+                destination["path"],
+                _draw_paths(u_path[mask], dct_flow[to_flow]["paths"]),
+            ]
+        )
+        destination["transfer"] = np.concatenate(
+            [destination["transfer"], np.full(mask.sum(), -1)]
+        )
+
+    # record arrays: one row per Pax, one column per station
+    for name, flow in dct_flow.items():
+        inputs = dct_input[name]
+        n_pax = len(inputs["df_Pax"])
+        inputs["stations"] = list(flow["stations"])
+        inputs["record"] = {
+            event: np.full((n_pax, len(flow["stations"])), np.nan)
+            for event in ["start_queue", "end_queue", "end_process"]
+        }
+        inputs["show_up"] = np.full(n_pax, np.nan)
+        # service time of each Pax at each station, relative to the Pt
+        inputs["service_factor"] = np.ones((n_pax, len(flow["stations"])))
+        if service_time_cv > 0:
+            shape = 1 / service_time_cv**2
+            inputs["service_factor"] = _stream(
+                seed, "service", inputs["flow_number"]
+            ).gamma(shape, 1 / shape, size=(n_pax, len(flow["stations"])))
+
+    if stats is not None:
+        stats.lap("input_prep")
+
+    # ======================================= Resources =======================================
+    if stats is None:
+        env = simpy.Environment(initial_time=0)
+    else:
+        env = stats.environment(initial_time=0)
+
+    class airport_creator(object):
+        """shared resources of all flows, and check-in of each flow"""
+
+        def __init__(self, env):
+            self.env = env
+            for resource, capacity in dct_resource.items():
+                if resource in priority_resources:
+                    setattr(
+                        self, resource, simpy.PriorityResource(env, capacity)
+                    )
+                else:
+                    setattr(self, resource, simpy.Resource(env, capacity))
+            # one check-in entity per airline and flow, as the models
+            self.checkin = []
+            self.checkin_index = {}
+            for name, flow in dct_flow.items():
+                if flow.get("df_Counters") is None:
+                    continue
+                for airline in np.unique(dct_input[name]["airline"]):
+                    self.checkin_index[(name, airline)] = len(self.checkin)
+                    self.checkin.append(simpy.PriorityResource(env, 1))
+
+    # resources where some Pax have priority, the others are FIFO
+    priority_resources = {
+        flow["stations"][station][0]
+        for flow in dct_flow.values()
+        for path in flow["paths"]
+        if _path_priority(path)[0] != 2
+        for station in _path_priority(path)[1]
+    }
+    airport = airport_creator(env)
+
+    dct_counters = {}
+    for name, flow in dct_flow.items():
+        if flow.get("df_Counters") is not None:
+            data = flow["df_Counters"].drop(columns=["total"])
+            dct_counters[name] = data.fillna(1e-12).replace(0, 1e-12)
+
+    def opened_counters(name, airline):
+        data = dct_counters[name]
+        return data[airline].iat[int(env.now / 5) % len(data)]
+
+    # ======================================= Pax journey =======================================
+    def Pax(env, name, index, start_station=None):
+        inputs = dct_input[name]
+        flow = dct_flow[name]
+        record = inputs["record"]
+        inputs["show_up"][index] = env.now
+
+        # transfer Pax leave this flow for another one
+        if inputs["transfer"][index] >= 0:
+            return
+
+        path = flow["paths"][inputs["path"][index]][1]
+        priority, prioritized = _path_priority(
+            flow["paths"][inputs["path"][index]]
+        )
+        if start_station is not None:
+            path = path[path.index(start_station) :]
+        for station in path:
+            column = inputs["stations"].index(station)
+            resource_name, Pt = flow["stations"][station]
+            Pt = Pt / 60 * inputs["service_factor"][index, column]
+            record["start_queue"][index, column] = env.now
+
+            if resource_name is None:
+                record["end_queue"][index, column] = env.now
+                yield env.timeout(Pt)
+
+            elif resource_name == "checkin":
+                airline = inputs["airline"][index]
+                # wait if counter is closed, not counted as queue
+                while opened_counters(name, airline) < 1:
+                    yield env.timeout(5)
+                record["start_queue"][index, column] = env.now
+                resource = airport.checkin[
+                    airport.checkin_index[(name, airline)]
+                ]
+                with resource.request(
+                    priority=priority if station in prioritized else 2
+                ) as request:
+                    yield request
+                    record["end_queue"][index, column] = env.now
+                    while opened_counters(name, airline) < 1:
+                        yield env.timeout(5)
+                    yield env.timeout(Pt / opened_counters(name, airline))
+                # dummy machine: until the full check-in process time
+                Pt_total = (
+                    flow.get("Pt_checkin_total", flow["stations"][station][1])
+                    / 60
+                    * inputs["service_factor"][index, column]
+                )
+                yield env.timeout(
+                    max(
+                        Pt_total - Pt / opened_counters(name, airline),
+                        0.00001,
+                    )
+                )
+
+            else:
+                resource = getattr(airport, resource_name)
+                if resource_name in priority_resources:
+                    request = resource.request(
+                        priority=priority if station in prioritized else 2
+                    )
+                else:
+                    request = resource.request()
+                with request:
+                    yield request
+                    record["end_queue"][index, column] = env.now
+                    yield env.timeout(Pt)
+
+            record["end_process"][index, column] = env.now
+
+    def Pax_generator(env, name):
+        """show-up of the Pax of one flow, in order of time"""
+        inputs = dct_input[name]
+        join = inputs.get("join", {})
+        order = np.argsort(inputs["minutes"], kind="mergesort")
+        for index in order:
+            delay = inputs["minutes"][index] - env.now
+            if delay > 0:
+                yield env.timeout(delay)
+            env.process(Pax(env, name, index, join.get(index)))
+
+    for name in dct_flow:
+        env.process(Pax_generator(env, name))
+
+    if stats is not None:
+        stats.track(airport)
+        stats.lap("generator_setup")
+
+    # Execute!
+    end_time = 1441
+    if origin is not None:
+        end_time = max(
+            end_time,
+            max(
+                int(np.nanmax(inputs["minutes"], initial=0))
+                for inputs in dct_input.values()
+            )
+            + 2,
+        )
+    env.run(until=end_time + 59)
+
+    if stats is not None:
+        stats.lap("env_run")
+
+    # ======================================= Results formatting =======================================
+    time_origin = pd.Timestamp("2020-10-13" if origin is None else origin)
+
+    def minutes_to_datetime(minutes):
+        if origin is None:
+            minutes = np.mod(minutes, 1440)
+        # NaT for the Pax not reaching the station (no cast of NaN)
+        seconds = np.floor(np.asarray(minutes, dtype=float) * 60)
+        finite = np.isfinite(seconds)
+        delta = np.full(len(seconds), np.timedelta64("NaT"), "timedelta64[s]")
+        delta[finite] = seconds[finite].astype(np.int64)
+        return time_origin + pd.to_timedelta(delta)
+
+    dct_result = {}
+    dct_hist_wait_time = {}
+    for name, inputs in dct_input.items():
+        df_Pax = inputs["df_Pax"]
+        record = inputs["record"]
+        df_result = pd.DataFrame(
+            {
+                "flight_number": df_Pax["Flight Number"].to_numpy(),
+                "STD": pd.to_datetime(df_Pax["Scheduled Time"]).to_numpy(),
+                "Pax_type": inputs["path"],
+                "transfer_out": inputs["transfer"] >= 0,
+                "transfer_in": (
+                    df_Pax["transfer"].notna().to_numpy()
+                    if "transfer" in df_Pax.columns
+                    else np.zeros(len(df_Pax), dtype=bool)
+                ),
+                "terminal_show_up": minutes_to_datetime(inputs["show_up"]),
+                "Pax_N": 1,
+            }
+        )
+        dct_hist_wait_time[name] = {}
+        for column, station in enumerate(inputs["stations"]):
+            start = record["start_queue"][:, column]
+            end = record["end_queue"][:, column]
+            for event in ["start_queue", "end_queue", "end_process"]:
+                df_result["{}_{}".format(event, station)] = (
+                    minutes_to_datetime(record[event][:, column])
+                )
+            # queue not ended during sim time: set the wait time high
+            wait_time = np.where(
+                np.isnan(end) & ~np.isnan(start),
+                14 * 60,
+                end - start,
+            )
+            df_result["wait_time_{}".format(station)] = pd.to_timedelta(
+                np.nan_to_num(wait_time) * 60, unit="s"
+            )
+            dct_hist_wait_time[name][station] = pd.Series(
+                wait_time, index=df_result.index
+            )[~np.isnan(start)]
+        dct_result[name] = df_result
+
+    if stats is not None:
+        stats.lap("formatting")
+
+    return dct_result, dct_hist_wait_time
+
+
+def _stream(seed, decision, number):
+    """independent random stream of one decision (see KIX_airport seed)"""
+    key = {"path": 0, "transfer": 1, "service": 2}[decision]
+    return np.random.default_rng([seed, key, number])
+
+
+def _path_priority(path):
+    """priority of the Pax of path, and the stations where it applies"""
+    priority = path[2] if len(path) > 2 else 2
+    prioritized = path[3] if len(path) > 3 else path[1]
+    return priority, set(prioritized)
+
+
+def _draw_paths(u, paths):
+    """
+    index of the path of each Pax from its uniform draw u, by inverse CDF
+    of the path ratios: a Pax keeps its path when the ratios change little
+    """
+    ratios = np.array([path[0] for path in paths], dtype=float)
+    cumulative = np.cumsum(ratios / ratios.sum())
+    return np.minimum(
+        np.searchsorted(cumulative, u, side="right"), len(paths) - 1
+    )
@@ -0,0 +1,250 @@
+# annual.py
+# includes:
+# - annual_inputs <- df_Pax (and df_Counters) of every date of a schedule,
+#   overnight Pax carried over to the day they show up
+# - simulate_day <- KPIs of one day run by any of the models
+# - wait_time_kpi <- P90, mean and max wait time of each system
+# - run_annual <- all days run in parallel (ray), one row of KPIs per day
+# - annual_kpi <- distribution of the daily KPIs over the year
+
+import numpy as np
+import pandas as pd
+import ray
+from tqdm import tqdm
+
+from src.utils.counters import (
+    N_SLOTS,
+    allocate_counters,
+    apply_T2_counter_rule,
+    counters_to_dataframe,
+)
+from src.utils.schedule_sources import (
+    ScheduleFileSource,
+    counter_rule,
+    counter_seats,
+    show_up_by_date,
+)
+
+
+def _shift_date(date_str, days):
+    return (pd.Timestamp(date_str) + pd.Timedelta(days=days)).strftime(
+        "%Y-%m-%d"
+    )
+
+
+def _overnight(df_Pax, direction):
+    """
+    Pax folded onto their flight date while showing up the day before
+    (departures) or the day after (arrivals)
+    """
+    if direction == "D":
+        return df_Pax["time"] > df_Pax["Scheduled Time"]
+    return df_Pax["time"] < df_Pax["Scheduled Time"]
+
+
+def _carry_over_pax(dct_pax, direction):
+    """
+    {date_str: df_Pax} with the overnight Pax moved to the day they show up
+    when that day is simulated too (kept folded on their own day otherwise)
+    """
+    step = -1 if direction == "D" else 1
+    dct_own, dct_moved = {}, {date_str: [] for date_str in dct_pax}
+    for date_str, df_Pax in dct_pax.items():
+        mask = _overnight(df_Pax, direction)
+        if _shift_date(date_str, step) in dct_pax:
+            dct_moved[_shift_date(date_str, step)].append(df_Pax[mask])
+            dct_own[date_str] = df_Pax[~mask]
+        else:
+            dct_own[date_str] = df_Pax
+
+    return {
+        date_str: pd.concat(
+            [dct_own[date_str]] + dct_moved[date_str], ignore_index=True
+        )
+        for date_str in dct_pax
+    }
+
+
+def _carry_over_counters(dct_data, rule):
+    """
+    {date_str: df_Counters}: counters opened on each day for the flights of
+    that day and of the next and previous days (when simulated too)
+    """
+    dct_3d = {}
+    for date_str, data in dct_data.items():
+        list_airline, array_seats = counter_seats(data)
+        dct_3d[date_str] = (
+            list_airline,
+            allocate_counters(array_seats, fold=False, **rule),
+        )
+
+    dct_counters = {}
+    for date_str in dct_data:
+        # (date of the flights, third of their 3 days falling on date_str)
+        # (own part kept when the other day is not simulated)
+        list_part = [(date_str, 1)]
+        for step, part, own_part in [(1, 0, 2), (-1, 2, 0)]:
+            other = _shift_date(date_str, step)
+            if other in dct_3d:
+                list_part.append((other, part))
+            else:
+                list_part.append((date_str, own_part))
+
+        dct_airline = {}
+        for other, part in list_part:
+            list_airline, array_3d = dct_3d[other]
+            array_part = array_3d[:, part * N_SLOTS : (part + 1) * N_SLOTS]
+            for airline, counters in zip(list_airline, array_part):
+                dct_airline[airline] = (
+                    dct_airline.get(airline, np.zeros(N_SLOTS)) + counters
+                )
+        dct_counters[date_str] = counters_to_dataframe(
+            list(dct_airline), np.array(list(dct_airline.values()))
+        )
+    return dct_counters
+
+
+def annual_inputs(
+    path_to_schedule,
+    direction="D",
+    list_date_str=None,
+    sector="I",
+    terminal="T1",
+    custom_showup=False,
+    custom_counter_rule=False,
+    carry_over=True,
+    **kwargs,
+):
+    """
+    {date_str: (df_Pax, df_Counters)} of every date of list_date_str
+    (all dates of the schedule if None), df_Counters is None for arrivals
+
+    carry_over: the Pax of departures after midnight showing up the
+    evening before (or of arrivals before midnight processed after it)
+    are simulated with the day they show up, with the check-in counters
+    opened for them; without carry_over each day wraps around like the
+    single day models (see utils/profiles_from_schedule.py)
+    """
+    source = ScheduleFileSource(
+        path_to_schedule, date_str=list_date_str, sector=sector
+    )
+    dct_date, filtered_data = show_up_by_date(
+        source,
+        direction=direction,
+        system="terminal" if direction == "D" else "arrivals",
+        terminal=terminal,
+        custom_showup=custom_showup,
+        custom_counter_rule=custom_counter_rule,
+        return_flights=True,
+        **kwargs,
+    )
+    if not carry_over:
+        dct_inputs = dct_date
+    else:
+        dct_pax = _carry_over_pax(
+            {date_str: df_Pax for date_str, (df_Pax, _) in dct_date.items()},
+            direction,
+        )
+        dct_counters = {date_str: None for date_str in dct_date}
+        if direction == "D":
+            dct_data = {
+                pd.Timestamp(date).strftime("%Y-%m-%d"): data.reset_index(
+                    drop=True
+                )
+                for date, data in filtered_data.groupby(
+                    "Flight Date", sort=False
+                )
+            }
+            dct_counters = _carry_over_counters(
+                dct_data, counter_rule(custom_counter_rule, **kwargs)
+            )
+        dct_inputs = {
+            date_str: (dct_pax[date_str], dct_counters[date_str])
+            for date_str in dct_date
+        }
+
+    if direction == "D" and terminal == "T2":
+        # apply the special T2 rule for counters
+        dct_inputs = {
+            date_str: (df_Pax, apply_T2_counter_rule(df_Counters))
+            for date_str, (df_Pax, df_Counters) in dct_inputs.items()
+        }
+    return dict(sorted(dct_inputs.items()))
+
+
+def simulate_day(model, df_Pax, df_Counters, dct_param):
+    """
+    run model (eg. KIX_T1d, KIX_T1a) on the inputs of one day
+    returns {"n_pax": , "P90_<system>": , "mean_<system>": ,
+    "max_<system>": } with the wait times in minutes
+    """
+    dct_param = dict(dct_param, df_Pax=df_Pax.copy(), show_loading=False)
+    if df_Counters is not None:
+        dct_param["df_Counters"] = df_Counters
+    _, _, dct_hist_wait_time, _ = model(**dct_param)
+
+    return dict({"n_pax": len(df_Pax)}, **wait_time_kpi(dct_hist_wait_time))
+
+
+def wait_time_kpi(dct_hist_wait_time):
+    """P90, mean and max wait time (minutes) of each system"""
+    dct_kpi = {}
+    for system, wait_time in dct_hist_wait_time.items():
+        dct_kpi["P90_{}".format(system)] = wait_time.quantile(q=0.90)
+        dct_kpi["mean_{}".format(system)] = wait_time.mean()
+        dct_kpi["max_{}".format(system)] = wait_time.max()
+    return dct_kpi
+
+
+def run_annual(model, dct_inputs, dct_param, parallel=True):
+    """
+    simulate every day of dct_inputs (see annual_inputs) as an independent
+    job, in parallel with ray if parallel
+    dct_param: parameters of model except df_Pax and df_Counters
+    returns one row of KPIs per day (see simulate_day)
+    """
+    list_date_str = list(dct_inputs)
+    if parallel:
+        # adapt ray to function
+        @ray.remote
+        def f(df_Pax, df_Counters):
+            return simulate_day(model, df_Pax, df_Counters, dct_param)
+
+        futures = [
+            f.remote(*dct_inputs[date_str]) for date_str in list_date_str
+        ]
+        list_kpi = ray.get(futures)
+    else:
+        list_kpi = [
+            simulate_day(model, *dct_inputs[date_str], dct_param)
+            for date_str in tqdm(list_date_str, desc="Days simulated...")
+        ]
+
+    df_daily = pd.DataFrame(list_kpi, index=pd.to_datetime(list_date_str))
+    df_daily.index.name = "Flight Date"
+    return df_daily
+
+
+def annual_kpi(df_daily, target_wait_time=10, quantile=0.90):
+    """
+    distribution over the days of the daily P90 wait time of each system:
+    days (and share of days) above target_wait_time (minutes),
+    quantile of the daily P90 (eg. P90 of daily P90), mean and worst day
+    """
+    list_system = [
+        column[4:] for column in df_daily.columns if column[:4] == "P90_"
+    ]
+    dct_kpi = {}
+    for system in list_system:
+        daily_p90 = df_daily["P90_{}".format(system)]
+        dct_kpi[system] = {
+            "days_above_target": int((daily_p90 > target_wait_time).sum()),
+            "share_days_above_target": (daily_p90 > target_wait_time).mean(),
+            "P{:.0f}_of_daily_P90".format(quantile * 100): daily_p90.quantile(
+                q=quantile
+            ),
+            "mean_daily_P90": daily_p90.mean(),
+            "worst_daily_P90": daily_p90.max(),
+            "worst_day": daily_p90.idxmax(),
+        }
+    return pd.DataFrame(dct_kpi).T
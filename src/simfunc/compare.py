@@ -0,0 +1,136 @@
+# compare.py
+# includes:
+# - model_runner <- run(seed, **scenario) -> KPIs of a model run
+# - compare_scenarios <- paired (common random numbers) comparison of two
+#   scenarios, deltas of each KPI with paired confidence intervals
+
+import numpy as np
+import pandas as pd
+import ray
+from scipy import stats as st
+
+from src.simfunc.annual import wait_time_kpi
+
+
+def model_runner(model, dct_param):
+    """
+    function run(seed, **scenario) returning the KPIs of one run of model
+    with dct_param updated by the scenario (eg. {"N_security_lanes": 16})
+
+    model: KIX_T1d, KIX_T1a... (KPIs of simfunc.annual.wait_time_kpi)
+    or KIX_airport (same KPIs, prefixed with the flow: "T1d/P90_kiosk")
+    """
+
+    def run(seed, **scenario):
+        dct_run = dict(dct_param, seed=seed, **scenario)
+        if "df_Pax" in dct_run:
+            dct_run["df_Pax"] = dct_run["df_Pax"].copy()
+            dct_run["show_loading"] = False
+        result = model(**dct_run)
+
+        if len(result) == 2:
+            # KIX_airport: {flow: {station: wait time}}
+            _, dct_hist_wait_time = result
+            return {
+                "{}/{}".format(flow, key): value
+                for flow, dct_flow in dct_hist_wait_time.items()
+                for key, value in wait_time_kpi(dct_flow).items()
+            }
+        _, _, dct_hist_wait_time, _ = result
+        return wait_time_kpi(dct_hist_wait_time)
+
+    return run
+
+
+def compare_scenarios(
+    run,
+    scenario_a,
+    scenario_b,
+    n_rep=10,
+    first_seed=12,
+    confidence=0.95,
+    parallel=False,
+):
+    """
+    paired comparison of scenario_b against scenario_a
+
+    replication i runs both scenarios with the seed first_seed + i, so
+    the Pax types (and service times, see KIX_airport) drawn for each Pax
+    are the same in both: the delta of each KPI only comes from the
+    change of scenario, and its variance is much lower than the one of two
+    independent runs (common random numbers)
+    the models (KIX_T1d, KIX_T1a...) draw the Pax types by shuffling lists
+    whose lengths depend on the ratios of Pax types: scenarios changing a
+    ratio (a parameter named with "ratio") are refused, compare them with
+    KIX_airport, which keeps the draws of each Pax when the ratios change
+
+    run: run(seed, **scenario) -> {KPI: value}, see model_runner
+    scenario_a, scenario_b: parameters changed by each scenario
+    parallel: run the replications in parallel with ray
+    returns (
+        df_compare: for each KPI, mean of a and b, mean delta (b - a),
+            paired confidence interval of the delta, and its half width
+            compared to independent runs (variance_reduction)
+        df_runs: KPIs of every run (scenario, seed)
+    )
+    """
+    list_ratio = sorted(
+        key
+        for key in set(scenario_a) | set(scenario_b)
+        if "ratio" in key and scenario_a.get(key) != scenario_b.get(key)
+    )
+    if list_ratio:
+        raise ValueError(
+            "scenarios differ in {}: the Pax types would not be drawn "
+            "the same in both".format(list_ratio)
+        )
+
+    list_seed = [first_seed + i for i in range(n_rep)]
+    list_job = [
+        (label, seed, scenario)
+        for seed in list_seed
+        for label, scenario in [("a", scenario_a), ("b", scenario_b)]
+    ]
+    if parallel:
+        # adapt ray to function
+        @ray.remote
+        def f(seed, scenario):
+            return run(seed, **scenario)
+
+        list_kpi = ray.get(
+            [f.remote(seed, scenario) for _, seed, scenario in list_job]
+        )
+    else:
+        list_kpi = [run(seed, **scenario) for _, seed, scenario in list_job]
+
+    df_runs = pd.DataFrame(
+        list_kpi,
+        index=pd.MultiIndex.from_tuples(
+            [(label, seed) for label, seed, _ in list_job],
+            names=["scenario", "seed"],
+        ),
+    )
+    df_a = df_runs.xs("a", level="scenario")
+    df_b = df_runs.xs("b", level="scenario")
+    df_delta = df_b - df_a
+
+    t_value = st.t.ppf((1 + confidence) / 2, df=max(n_rep - 1, 1))
+    half_width = t_value * df_delta.std(ddof=1) / np.sqrt(n_rep)
+    half_width_independent = (
+        t_value * np.sqrt(df_a.var(ddof=1) + df_b.var(ddof=1)) / np.sqrt(n_rep)
+    )
+    df_compare = pd.DataFrame(
+        {
+            "mean_a": df_a.mean(),
+            "mean_b": df_b.mean(),
+            "delta": df_delta.mean(),
+            "ci_low": df_delta.mean() - half_width,
+            "ci_high": df_delta.mean() + half_width,
+            "half_width": half_width,
+            "half_width_independent": half_width_independent,
+            "variance_reduction": (
+                (df_a.var(ddof=1) + df_b.var(ddof=1)) / df_delta.var(ddof=1)
+            ),
+        }
+    )
+    return df_compare, df_runs
@@ -0,0 +1,361 @@
+# fluid.py
+# includes:
+# - fluid_airport <- deterministic fluid approximation of KIX_airport,
+#   backlog and wait time curves per minute in milliseconds
+# - fluid_T1d, fluid_T1a <- same arguments and outputs as KIX_T1d / KIX_T1a
+#   (wait times only), to screen configurations before simulating
+
+import numpy as np
+import pandas as pd
+
+from src.simfunc.KIX_airport import flow_T1a, flow_T1d
+
+# wait time of the Pax not processed before the end (as the models)
+NOT_PROCESSED = 14 * 60
+
+
+def fluid_airport(dct_flow: dict, dct_resource: dict, origin: str = None):
+    """
+    fluid approximation of KIX_airport with the same inputs (see KIX_airport
+    for dct_flow and dct_resource, transfers are not supported)
+
+    the Pax of each flow are split between the paths by their ratios and
+    go through the stations as a flow of Pax per minute: each resource
+    serves N / Pt Pax per minute (the opened counters of the airline for
+    check-in), the backlog is carried to the next minute and the wait time
+    of the Pax arriving at a minute is the time to serve the backlog in
+    front of them (first come first served, no priority, no variability
+    of the service times: an estimate close to the simulation for screening,
+    not a bound)
+
+    returns (
+        dct_curve: {flow: DataFrame per minute with the arrivals [Pax/min]
+            and the wait time [min] at each station},
+        dct_hist_wait_time: {flow: {station: wait time [min] of each Pax}},
+            as KIX_airport
+    )
+    """
+    # ======================================= Inputs =======================================
+    dct_minutes = {}
+    end_time = 1441
+    for name, flow in dct_flow.items():
+        df_Pax = flow["df_Pax"]
+        if origin is None:
+            minutes = (
+                df_Pax["time"].dt.hour * 60
+                + df_Pax["time"].dt.minute
+                + df_Pax["time"].dt.second / 60
+            ).to_numpy(dtype=float)
+        else:
+            minutes = (
+                df_Pax["time"] - pd.Timestamp(origin)
+            ).dt.total_seconds().to_numpy() / 60
+            end_time = max(end_time, int(np.nanmax(minutes, initial=0)) + 2)
+        dct_minutes[name] = minutes
+    n_minutes = end_time + 59
+
+    list_cohort = []
+    for name, flow in dct_flow.items():
+        df_Pax = flow["df_Pax"]
+        minutes = dct_minutes[name]
+        # one cohort per path and airline (for its check-in counters)
+        airline = df_Pax["Flight Number"].str.split().str[0].to_numpy()
+        ratios = np.array([path[0] for path in flow["paths"]], dtype=float)
+        ratios = ratios / ratios.sum()
+        for value in np.unique(airline):
+            mask = airline == value
+            arrivals = np.bincount(
+                minutes[mask].astype(int), minlength=n_minutes
+            ).astype(float)
+            for path, ratio in zip(flow["paths"], ratios):
+                if ratio > 0:
+                    list_cohort.append(
+                        {
+                            "flow": name,
+                            "airline": value,
+                            "path": path[1],
+                            "arrivals": ratio * arrivals,
+                            "position": 0,
+                        }
+                    )
+
+    # time grid of the counters opened per airline (5 minutes slots)
+    dct_counters = {}
+    for name, flow in dct_flow.items():
+        if flow.get("df_Counters") is not None:
+            data = flow["df_Counters"].drop(columns=["total"]).fillna(0)
+            # less than one counter is closed, as the models
+            data = data.where(data >= 1, 0)
+            slots = np.arange(n_minutes) // 5 % len(data)
+            dct_counters[name] = {
+                airline: data[airline].to_numpy(dtype=float)[slots]
+                for airline in data.columns
+            }
+
+    def resource_of(cohort):
+        station = cohort["path"][cohort["position"]]
+        resource_name, _ = dct_flow[cohort["flow"]]["stations"][station]
+        if resource_name == "checkin":
+            return ("checkin", cohort["flow"], cohort["airline"])
+        return resource_name
+
+    # ======================================= Stations =======================================
+    # (flow, station) -> list of (arrivals per minute, wait time per minute)
+    dct_record = {}
+
+    def advance(list_group, capacity=None, opening=None):
+        """
+        move the cohorts of list_group through their current station,
+        sharing capacity [servers per minute] first come first served
+        """
+        if capacity is not None:
+            # work of the arrivals [server minutes] and backlog
+            list_Pt = []
+            for cohort in list_group:
+                flow = dct_flow[cohort["flow"]]
+                _, Pt = flow["stations"][cohort["path"][cohort["position"]]]
+                list_Pt.append(Pt / 60)
+            work = sum(
+                cohort["arrivals"] * Pt
+                for cohort, Pt in zip(list_group, list_Pt)
+            )
+            served = np.zeros(n_minutes)
+            backlog = 0.0
+            for t in range(n_minutes):
+                served[t] = min(backlog + work[t], capacity[t])
+                backlog += work[t] - served[t]
+            # work arrived before each minute, served by the end of each
+            cumulative_work = np.concatenate([[0.0], np.cumsum(work)[:-1]])
+            cumulative_served = np.cumsum(served)
+            # minute (interpolated) when the work in front is served
+            t_end = np.searchsorted(
+                cumulative_served, cumulative_work - 1e-9, side="left"
+            )
+            in_time = t_end < n_minutes
+            t_end = np.minimum(t_end, n_minutes - 1)
+            before = np.where(
+                t_end > 0, cumulative_served[np.maximum(t_end - 1, 0)], 0
+            )
+            fraction = np.where(
+                served[t_end] > 0,
+                (cumulative_work - before) / np.maximum(served[t_end], 1e-12),
+                0,
+            )
+            start_service = t_end + np.clip(fraction, 0, 1)
+            start = np.arange(n_minutes) if opening is None else opening
+            wait_time = np.where(
+                in_time, np.maximum(start_service - start, 0), NOT_PROCESSED
+            )
+        else:
+            wait_time = np.zeros(n_minutes)
+            in_time = np.ones(n_minutes, dtype=bool)
+
+        for cohort in list_group:
+            flow = dct_flow[cohort["flow"]]
+            station = cohort["path"][cohort["position"]]
+            resource_name, Pt = flow["stations"][station]
+            if resource_name == "checkin":
+                # dummy machine: until the full check-in process time
+                Pt = flow.get("Pt_checkin_total", Pt)
+            dct_record.setdefault((cohort["flow"], station), []).append(
+                (cohort["arrivals"], wait_time)
+            )
+            # arrivals at the next station
+            leave = np.arange(n_minutes) + wait_time + Pt / 60
+            if opening is not None:
+                leave = leave + (opening - np.arange(n_minutes))
+            arrivals = np.zeros(n_minutes)
+            mask = in_time & (leave < n_minutes)
+            np.add.at(
+                arrivals, leave[mask].astype(int), cohort["arrivals"][mask]
+            )
+            cohort["arrivals"] = arrivals
+            cohort["position"] += 1
+
+    # a resource is processed once every cohort using it has reached it
+    list_active = list(list_cohort)
+    while list_active:
+        dct_next = {}
+        set_later = set()
+        for cohort in list_active:
+            dct_next.setdefault(resource_of(cohort), []).append(cohort)
+            set_later.update(
+                resource_of(dict(cohort, position=position))
+                for position in range(
+                    cohort["position"] + 1, len(cohort["path"])
+                )
+            )
+        list_ready = [
+            resource for resource in dct_next if resource not in set_later
+        ]
+        if not list_ready:
+            raise ValueError("stations used in different orders by paths")
+
+        resource = list_ready[0]
+        if resource is None:
+            advance(dct_next[resource])
+        elif isinstance(resource, tuple):
+            _, name, airline = resource
+            counters = dct_counters[name].get(airline, np.zeros(n_minutes))
+            # first minute with an opened counter, from each minute
+            minute_open = np.where(
+                counters > 0, np.arange(n_minutes), n_minutes - 1
+            )
+            advance(
+                dct_next[resource],
+                capacity=counters,
+                opening=np.minimum.accumulate(minute_open[::-1])[::-1],
+            )
+        else:
+            advance(
+                dct_next[resource],
+                capacity=np.full(n_minutes, float(dct_resource[resource])),
+            )
+        list_active = [
+            cohort
+            for cohort in list_active
+            if cohort["position"] < len(cohort["path"])
+        ]
+
+    # ======================================= Results formatting =======================================
+    dct_curve = {}
+    dct_hist_wait_time = {}
+    for name, flow in dct_flow.items():
+        df_curve = pd.DataFrame(index=pd.RangeIndex(n_minutes, name="minute"))
+        dct_hist_wait_time[name] = {}
+        for station in flow["stations"]:
+            list_record = dct_record.get((name, station), [])
+            if not list_record:
+                continue
+            arrivals = np.concatenate([record[0] for record in list_record])
+            wait_time = np.concatenate([record[1] for record in list_record])
+            total = sum(record[0] for record in list_record)
+            df_curve["arrivals_{}".format(station)] = total
+            df_curve["wait_time_{}".format(station)] = sum(
+                record[0] * record[1] for record in list_record
+            ) / np.where(total > 0, total, 1)
+            # one value per Pax (fractions of Pax rounded cumulatively)
+            count = np.diff(np.round(np.cumsum(arrivals)), prepend=0)
+            dct_hist_wait_time[name][station] = pd.Series(
+                np.repeat(wait_time, count.astype(int))
+            )
+        dct_curve[name] = df_curve
+
+    return dct_curve, dct_hist_wait_time
+
+
+def fluid_T1d(
+    df_Pax,
+    df_Counters,
+    Pt_checkin_1step_counter,
+    Pt_checkin_2step_counter,
+    N_kiosk,
+    Pt_kiosk,
+    N_security_lanes,
+    Pt_security_lanes,
+    N_emigration_counter,
+    Pt_emigration_counter,
+    N_emigration_self,
+    Pt_emigration_self,
+    modern_pax_ratio,
+    digital_pax_ratio,
+    premium_pax_ratio,
+    origin=None,
+    **kwargs,
+):
+    """
+    fluid_airport with the arguments of KIX_T1d (the others are ignored)
+    returns (None, [], dct_hist_wait_time, {}) as KIX_T1d, with the systems
+    kiosk, checkin_counter, security_lanes, emigration_counter and
+    emigration_self, so it can replace KIX_T1d in the optimizers
+    (eg. min_resources(fluid_T1d, ...) or as their screen)
+    """
+    flow = flow_T1d(
+        df_Pax,
+        df_Counters,
+        Pt_checkin_1step_counter,
+        Pt_checkin_2step_counter,
+        Pt_kiosk,
+        Pt_security_lanes,
+        Pt_emigration_counter,
+        Pt_emigration_self,
+        modern_pax_ratio,
+        digital_pax_ratio,
+        premium_pax_ratio,
+        security="security_lanes",
+        emigration_counter="emigration_counter",
+        emigration_self="emigration_self",
+        kiosk="kiosk",
+    )
+    _, dct_hist_wait_time = fluid_airport(
+        {"T1d": flow},
+        {
+            "kiosk": N_kiosk,
+            "security_lanes": N_security_lanes,
+            "emigration_counter": N_emigration_counter,
+            "emigration_self": N_emigration_self,
+        },
+        origin=origin,
+    )
+    dct_hist_wait_time = dct_hist_wait_time["T1d"]
+    dct_hist_wait_time["checkin_counter"] = pd.concat(
+        [
+            dct_hist_wait_time.pop(station)
+            for station in ["checkin_1step", "checkin_2step"]
+            if station in dct_hist_wait_time
+        ],
+        ignore_index=True,
+    )
+    return None, [], dct_hist_wait_time, {}
+
+
+def fluid_T1a(
+    df_Pax,
+    N_quarantine,
+    Pt_quarantine,
+    N_immigration_counter,
+    Pt_immigration_counter,
+    N_immigration_self,
+    Pt_immigration_self,
+    Wt_bag_claim,
+    N_customs_counter,
+    Pt_customs_counter,
+    N_customs_self,
+    Pt_customs_self,
+    traditional_pax_ratio,
+    no_bag_pax_ratio,
+    origin=None,
+    **kwargs,
+):
+    """
+    fluid_airport with the arguments of KIX_T1a (the others are ignored)
+    returns (None, [], dct_hist_wait_time, {}) as KIX_T1a
+    """
+    flow = flow_T1a(
+        df_Pax,
+        Pt_quarantine,
+        Pt_immigration_counter,
+        Pt_immigration_self,
+        Wt_bag_claim,
+        Pt_customs_counter,
+        Pt_customs_self,
+        traditional_pax_ratio,
+        no_bag_pax_ratio,
+        quarantine="quarantine",
+        immigration_counter="immigration_counter",
+        immigration_self="immigration_self",
+        customs_counter="customs_counter",
+        customs_self="customs_self",
+    )
+    _, dct_hist_wait_time = fluid_airport(
+        {"T1a": flow},
+        {
+            "quarantine": N_quarantine,
+            "immigration_counter": N_immigration_counter,
+            "immigration_self": N_immigration_self,
+            "customs_counter": N_customs_counter,
+            "customs_self": N_customs_self,
+        },
+        origin=origin,
+    )
+    return None, [], dct_hist_wait_time["T1a"], {}
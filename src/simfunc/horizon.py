@@ -0,0 +1,186 @@
+# horizon.py
+# includes:
+# - continuous_inputs <- df_Pax with absolute times and df_Counters
+#   of several days on one continuous time base
+# - continuous_counters <- check-in counters of several days, per 5 minutes
+# - run_horizon <- rolling horizon run of a model, one window at a time
+
+import numpy as np
+import pandas as pd
+
+from src.simfunc.annual import wait_time_kpi
+from src.utils.counters import (
+    N_SLOTS,
+    allocate_counters,
+    apply_T2_counter_rule,
+    counters_to_dataframe,
+)
+from src.utils.schedule_sources import (
+    ScheduleFileSource,
+    counter_rule,
+    counter_seats,
+    show_up_pipeline,
+)
+
+
+def continuous_counters(dct_data, rule, origin):
+    """
+    df_Counters of the departures of several dates {date_str: data},
+    one row per 5 minutes from origin until the end of the day after
+    the last date: the counters of each flight are opened on its actual
+    day, including the evening before for flights after midnight
+    """
+    origin = pd.Timestamp(origin)
+    list_day = [
+        (pd.Timestamp(date_str) - origin).days for date_str in dct_data
+    ]
+    n_rows = (max(list_day) + 2) * N_SLOTS
+
+    dct_airline = {}
+    for day, data in zip(list_day, dct_data.values()):
+        list_airline, array_seats = counter_seats(data)
+        # previous, same and next day of the flights of that date
+        array_3d = allocate_counters(array_seats, fold=False, **rule)
+        first = (day - 1) * N_SLOTS
+        for airline, counters in zip(list_airline, array_3d):
+            if airline not in dct_airline:
+                dct_airline[airline] = np.zeros(n_rows)
+            dct_airline[airline][first : first + 3 * N_SLOTS] += counters
+
+    return counters_to_dataframe(
+        list(dct_airline), np.array(list(dct_airline.values()))
+    )
+
+
+def continuous_inputs(
+    path_to_schedule,
+    direction="D",
+    list_date_str=None,
+    sector="I",
+    terminal="T1",
+    custom_showup=False,
+    custom_counter_rule=False,
+    **kwargs,
+):
+    """
+    df_Pax, df_Counters (None for arrivals) and origin of the dates of
+    list_date_str (all dates of the schedule if None) on one time base:
+    absolute show-up and scheduled times, counters from origin,
+    the midnight before the first date
+
+    pass origin to the models (eg. KIX_T1d(..., origin=origin))
+    to simulate all the dates in one run, or use run_horizon
+    """
+    source = ScheduleFileSource(
+        path_to_schedule, date_str=list_date_str, sector=sector
+    )
+    _, df_Pax, filtered_data, _ = show_up_pipeline(
+        source,
+        direction=direction,
+        system="terminal" if direction == "D" else "arrivals",
+        terminal=terminal,
+        custom_showup=custom_showup,
+        continuous=True,
+        return_flights=True,
+        **kwargs,
+    )
+    origin = (
+        pd.to_datetime(filtered_data["Flight Date"]).min().normalize()
+        - pd.Timedelta(days=1)
+    ).strftime("%Y-%m-%d")
+
+    df_Counters = None
+    if direction == "D":
+        dct_data = {
+            pd.Timestamp(date).strftime("%Y-%m-%d"): data.reset_index(
+                drop=True
+            )
+            for date, data in filtered_data.groupby("Flight Date", sort=True)
+        }
+        df_Counters = continuous_counters(
+            dct_data, counter_rule(custom_counter_rule, **kwargs), origin
+        )
+        if terminal == "T2":
+            # apply the special T2 rule for counters
+            df_Counters = apply_T2_counter_rule(df_Counters)
+
+    return df_Pax, df_Counters, origin
+
+
+def run_horizon(
+    model,
+    df_Pax,
+    df_Counters,
+    dct_param,
+    origin,
+    window="1D",
+    warmup="6H",
+    keep_results=False,
+):
+    """
+    simulate a multi-day continuous df_Pax (see continuous_inputs)
+    one window at a time: each run simulates the Pax showing up in the
+    window and during the warmup before it, so the queues at the start
+    of the window are those left by the previous window; only the Pax
+    showing up in the window are kept, then the run is released, so the
+    memory is bounded by one window whatever the horizon
+
+    dct_param: parameters of model except df_Pax, df_Counters and origin
+    keep_results: also return the df_result of the Pax of every window
+    (memory grows with the horizon again)
+    returns one row of KPIs per window (see annual.simulate_day),
+    and the concatenated df_result if keep_results
+    """
+    origin = pd.Timestamp(origin)
+    window = pd.Timedelta(window)
+    warmup = pd.Timedelta(warmup)
+    slot = pd.Timedelta(minutes=5)
+
+    list_start = pd.date_range(
+        df_Pax["time"].min().floor(window), df_Pax["time"].max(), freq=window
+    )
+    list_kpi, list_result = [], []
+    for start in list_start:
+        mask = (df_Pax["time"] >= start - warmup) & (
+            df_Pax["time"] < start + window
+        )
+        # run on the counters from the slot of the first Pax of the run
+        first_slot = max(0, (start - warmup - origin) // slot)
+        run_origin = origin + first_slot * slot
+
+        dct_run = dict(
+            dct_param,
+            df_Pax=df_Pax[mask].reset_index(drop=True),
+            origin=run_origin.strftime("%Y-%m-%d %H:%M:%S"),
+            show_loading=False,
+        )
+        if df_Counters is not None:
+            dct_run["df_Counters"] = df_Counters.iloc[first_slot:].reset_index(
+                drop=True
+            )
+        df_result, _, dct_hist_wait_time, _ = model(**dct_run)
+
+        # Pax of the window only, not of the warmup
+        in_window = df_result["terminal_show_up"] >= start
+        dct_kpi = {
+            "n_pax": int(in_window.sum()),
+            "n_pax_warmup": int((~in_window).sum()),
+        }
+        dct_kpi.update(
+            wait_time_kpi(
+                {
+                    system: wait_time[in_window.reindex(wait_time.index)]
+                    for system, wait_time in dct_hist_wait_time.items()
+                }
+            )
+        )
+        list_kpi.append(dct_kpi)
+        if keep_results:
+            list_result.append(df_result[in_window])
+        del df_result, dct_hist_wait_time
+
+    df_horizon = pd.DataFrame(list_kpi, index=list_start)
+    df_horizon.index.name = "window"
+    if keep_results:
+        return df_horizon, pd.concat(list_result, ignore_index=True)
+    return df_horizon
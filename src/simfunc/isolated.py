@@ -0,0 +1,285 @@
+# isolated.py
+# includes:
+# - record_stream <- Pax arriving at a station of KIX_T1d in a full run
+# - isolated_T1d <- same arguments and outputs as KIX_T1d, simulating only
+#   the station of a recorded stream and the stations after it
+# - station_T1d <- station of KIX_T1d sized by a variable (eg. N_security_lanes)
+
+import numpy as np
+import pandas as pd
+import simpy
+
+# wait time of the Pax not processed before the end (as the models)
+NOT_PROCESSED = 14 * 60
+
+# stations of KIX_T1d that can be simulated alone:
+# station: (resource and dct_hist_wait_time key, N parameter, Pt parameter)
+DCT_STATION_T1D = {
+    "security": ("security_lanes", "N_security_lanes", "Pt_security_lanes"),
+    "emigration_counter": (
+        "emigration_counter",
+        "N_emigration_counter",
+        "Pt_emigration_counter",
+    ),
+    "emigration_self": (
+        "emigration_self",
+        "N_emigration_self",
+        "Pt_emigration_self",
+    ),
+}
+
+# parameters of KIX_T1d changing the Pax flow reaching the security
+LIST_UPSTREAM_T1D = [
+    "df_Pax",
+    "df_Counters",
+    "Pt_checkin_1step_counter",
+    "Pt_checkin_2step_counter",
+    "N_kiosk",
+    "Pt_kiosk",
+    "modern_pax_ratio",
+    "digital_pax_ratio",
+    "premium_pax_ratio",
+    "start_special_pax_ratio",
+    "end_special_pax_ratio",
+    "origin",
+    "seed",
+]
+
+
+def station_T1d(variable_string):
+    """station of KIX_T1d sized by variable_string (eg. N_security_lanes)"""
+    for station, (_, N_variable, _) in DCT_STATION_T1D.items():
+        if N_variable == variable_string:
+            return station
+    raise ValueError(
+        "{} does not size a station that can be simulated alone, "
+        "only {}".format(
+            variable_string,
+            [value[1] for value in DCT_STATION_T1D.values()],
+        )
+    )
+
+
+def record_stream(model, dct_param, station):
+    """
+    run model (KIX_T1d) once with dct_param and record the Pax arriving at
+    station ("security", "emigration_counter" or "emigration_self")
+
+    returns df_stream: Pax_ID, pax_type and minutes (arrival at the
+    station) of each Pax, by arrival, with attrs station, until (end of the
+    run) and param (the parameters of the run changing the stream), see
+    isolated_T1d
+    """
+    if station not in DCT_STATION_T1D:
+        raise ValueError(
+            "station must be one of {}".format(list(DCT_STATION_T1D))
+        )
+
+    # the stop condition sees df_result filled during the run (in minutes,
+    # changed to datetimes after the run)
+    column = "start_{}_queue".format(station)
+    dct_run = {}
+
+    def recorder(env, creator, df_result):
+        dct_run["df_result"] = df_result[["Pax_ID", column]].copy()
+        dct_run["until"] = env.now
+        return False
+
+    model(
+        **dict(
+            dct_param,
+            df_Pax=dct_param["df_Pax"].copy(),
+            show_loading=False,
+            stop_condition=recorder,
+        )
+    )
+    df_result = dct_run["df_result"]
+
+    start = df_result[column]
+    df_stream = (
+        pd.DataFrame({"Pax_ID": df_result["Pax_ID"], "minutes": start})[
+            start.notna()
+        ]
+        .sort_values("minutes", kind="stable")
+        .reset_index(drop=True)
+    )
+    df_stream["pax_type"] = df_stream["Pax_ID"].str.split("_").str[-1]
+    df_stream.attrs = {
+        "station": station,
+        "until": dct_run["until"],
+        "param": {
+            key: dct_param[key]
+            for key in _upstream_parameters(station)
+            if key in dct_param
+        },
+    }
+    return df_stream
+
+
+def isolated_T1d(
+    df_stream,
+    N_security_lanes,
+    Pt_security_lanes,
+    N_emigration_counter,
+    Pt_emigration_counter,
+    N_emigration_self,
+    Pt_emigration_self,
+    **kwargs,
+):
+    """
+    KIX_T1d from the stream of record_stream: the Pax arrive at its station
+    when they did in the recorded run and go through it and the stations
+    after it only (security then emigration counter for the traditional
+    and premium Pax, emigration self for the modern and digital ones)
+
+    the other arguments of KIX_T1d are only compared to the recorded run:
+    df_result.attrs["exact"] is True when none of the parameters changing
+    the stream differs (the results are then those of KIX_T1d, up to the
+    order of the Pax arriving at the same time), False when the stream
+    of the recorded run is only an approximation
+
+    returns (df_result, [], dct_hist_wait_time, dct_hist_queue_length) as
+    KIX_T1d, for the simulated systems, so it can replace KIX_T1d in the
+    optimizers, eg. univariate_wait_time_function(
+        functools.partial(isolated_T1d, df_stream), "N_security_lanes", ...)
+    """
+    station = df_stream.attrs["station"]
+    dct_run = dict(
+        kwargs,
+        N_security_lanes=N_security_lanes,
+        Pt_security_lanes=Pt_security_lanes,
+        N_emigration_counter=N_emigration_counter,
+        Pt_emigration_counter=Pt_emigration_counter,
+        N_emigration_self=N_emigration_self,
+        Pt_emigration_self=Pt_emigration_self,
+    )
+    exact = all(
+        _same(dct_run.get(key, value), value)
+        for key, value in df_stream.attrs["param"].items()
+    )
+
+    # ======================================= Simulation =======================================
+    env = simpy.Environment(initial_time=0)
+    dct_resource = {
+        "security": simpy.PriorityResource(env, N_security_lanes),
+        "emigration_counter": simpy.Resource(env, N_emigration_counter),
+        "emigration_self": simpy.Resource(env, N_emigration_self),
+    }
+    dct_Pt = {
+        "security": Pt_security_lanes / 60,
+        "emigration_counter": Pt_emigration_counter / 60,
+        "emigration_self": Pt_emigration_self / 60,
+    }
+
+    list_route = [
+        _route(station, pax_type) for pax_type in df_stream["pax_type"]
+    ]
+    list_station = [
+        value
+        for value in DCT_STATION_T1D
+        if any(value in route for route in list_route)
+    ]
+    # results in minutes, named as in KIX_T1d
+    dct_result = {
+        column.format(value): np.full(len(df_stream), np.nan)
+        for value in list_station
+        for column in [
+            "{}_queue_length",
+            "start_{}_queue",
+            "end_{}_queue",
+            "end_{}_process",
+        ]
+    }
+
+    def Pax(env, index, route, priority):
+        for value in route:
+            resource = dct_resource[value]
+            if value == "security":
+                request = resource.request(priority=priority)
+            else:
+                request = resource.request()
+            with request:
+                dct_result["{}_queue_length".format(value)][index] = len(
+                    resource.queue
+                )
+                dct_result["start_{}_queue".format(value)][index] = env.now
+                yield request
+                dct_result["end_{}_queue".format(value)][index] = env.now
+                yield env.timeout(dct_Pt[value])
+                dct_result["end_{}_process".format(value)][index] = env.now
+
+    def Pax_generator(env):
+        for index, (minutes, pax_type, route) in enumerate(
+            zip(df_stream["minutes"], df_stream["pax_type"], list_route)
+        ):
+            yield env.timeout(minutes - env.now)
+            priority = 1 if pax_type == "premium" else 2
+            env.process(Pax(env, index, route, priority))
+
+    env.process(Pax_generator(env))
+    env.run(until=df_stream.attrs["until"])
+
+    # ======================================= Results formatting =======================================
+    origin = dct_run.get("origin", df_stream.attrs["param"].get("origin"))
+    df_result = pd.DataFrame(
+        dict({"Pax_ID": df_stream["Pax_ID"]}, **dct_result)
+    )
+    df_result.attrs["exact"] = exact
+    df_result.attrs["aborted"] = None
+
+    dct_hist_wait_time = {}
+    dct_hist_queue_length = {}
+    for value in list_station:
+        system = DCT_STATION_T1D[value][0]
+        mask = df_result["start_{}_queue".format(value)].notna()
+        start = _seconds(df_result["start_{}_queue".format(value)], origin)
+        end = _seconds(df_result["end_{}_queue".format(value)], origin)
+        dct_hist_wait_time[system] = ((end - start) / 60).fillna(
+            NOT_PROCESSED
+        )[mask]
+        dct_hist_queue_length[system] = df_result[
+            "{}_queue_length".format(value)
+        ][mask]
+
+    return df_result, [], dct_hist_wait_time, dct_hist_queue_length
+
+
+def _seconds(minutes, origin):
+    """
+    times of KIX_T1d in whole seconds: from origin, or in one day
+    (the times after midnight folded as the results of KIX_T1d)
+    """
+    if origin is not None:
+        return np.floor(minutes * 60)
+    return (
+        np.floor((minutes % 1440) // 60) * 3600
+        + np.floor(minutes % 60) * 60
+        + np.floor((minutes % 1) * 60)
+    )
+
+
+def _route(station, pax_type):
+    """stations of a Pax from station"""
+    if pax_type in ["traditional", "premium"]:
+        route = ["security", "emigration_counter"]
+    else:
+        route = ["security", "emigration_self"]
+    return route[route.index(station) :] if station in route else []
+
+
+def _upstream_parameters(station):
+    """parameters of KIX_T1d changing the Pax flow reaching station"""
+    list_parameter = list(LIST_UPSTREAM_T1D)
+    if station != "security":
+        list_parameter += ["N_security_lanes", "Pt_security_lanes"]
+    return list_parameter
+
+
+def _same(a, b):
+    if isinstance(a, pd.DataFrame) or isinstance(b, pd.DataFrame):
+        return a is b or (
+            isinstance(a, pd.DataFrame)
+            and isinstance(b, pd.DataFrame)
+            and a.equals(b)
+        )
+    return a == b
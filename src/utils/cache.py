@@ -0,0 +1,127 @@
+# cache.py
+# includes:
+# - get_config <- AutoConfig of data/secret/.env, parsed once per session
+# - input_path <- path of an input file declared in .env
+# - read_excel_cached <- pd.read_excel served from memory or from a columnar cache
+# - cached_frame <- same cache for any DataFrame derived from an input file
+
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+from decouple import AutoConfig
+
+ROOT_PATH = Path(__file__).parent / ".." / ".."
+DOTENV_FILE_PATH = ROOT_PATH / "data" / "secret" / ".env"
+CACHE_PATH = ROOT_PATH / "data" / "interim" / "cache"
+
+# {(file_signature, name): DataFrame}
+_memory_cache = {}
+
+
+@lru_cache(maxsize=None)
+def get_config():
+    """AutoConfig for the local .env (schedule and show-up files paths)"""
+    return AutoConfig(search_path=DOTENV_FILE_PATH)
+
+
+def input_path(key):
+    """path of the input file stored under `key` in .env"""
+    return ROOT_PATH / get_config()(key)
+
+
+def file_signature(path):
+    """identify one version of a file: (absolute path, mtime, size)"""
+    path = Path(path).resolve()
+    stat = path.stat()
+    return (str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def cached_frame(path, name, builder, copy=True):
+    """
+    return the DataFrame built by builder() from the input file `path`
+
+    the result is kept in memory and written to data/interim/cache
+    (parquet, or pickle when the frame cannot be stored as parquet).
+    Both are keyed by the file path, mtime and size: editing the input file
+    invalidates the cache. A copy is returned so callers can modify it;
+    with copy=False the cached frame itself is returned, to be read only
+    (eg. to select rows, the selection being a new frame).
+    """
+    signature = file_signature(path)
+    key = (signature, name)
+
+    if key not in _memory_cache:
+        cache_stem = "{}_{}".format(
+            Path(path).stem, _hash((signature[0], name))
+        )
+        cache_file = CACHE_PATH / "{}_{}".format(cache_stem, _hash(key))
+
+        df = _read_cache_file(cache_file)
+        if df is None:
+            df = builder()
+            _write_cache_file(df, cache_file, cache_stem)
+        _memory_cache[key] = df
+
+    if copy:
+        return _memory_cache[key].copy()
+    return _memory_cache[key]
+
+
+def read_excel_cached(path, sheet_name, header=0):
+    """pd.read_excel(path, sheet_name=sheet_name, header=header) through the cache"""
+    return cached_frame(
+        path,
+        "sheet={}|header={}".format(sheet_name, header),
+        lambda: pd.read_excel(path, sheet_name=sheet_name, header=header),
+    )
+
+
+def clear_cache(disk=False):
+    """empty the memory cache, and the files in data/interim/cache if disk"""
+    _memory_cache.clear()
+    if disk and CACHE_PATH.exists():
+        for cache_file in CACHE_PATH.glob("*"):
+            cache_file.unlink()
+
+
+def _hash(key):
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+
+
+def _with_extension(cache_file, extension):
+    """
+    cache_file with extension appended: with_suffix would replace the end
+    of a file name with a dot (eg. FY2019.v2_<hash>_<hash>), hashes included
+    """
+    return cache_file.parent / (cache_file.name + extension)
+
+
+def _read_cache_file(cache_file):
+    parquet_file = _with_extension(cache_file, ".parquet")
+    pickle_file = _with_extension(cache_file, ".pkl")
+    try:
+        if parquet_file.exists():
+            return pd.read_parquet(parquet_file)
+        if pickle_file.exists():
+            return pd.read_pickle(pickle_file)
+    except Exception:
+        # unreadable cache (eg. pyarrow missing): rebuild from source
+        return None
+    return None
+
+
+def _write_cache_file(df, cache_file, cache_stem):
+    CACHE_PATH.mkdir(parents=True, exist_ok=True)
+
+    # remove the files cached for previous versions of the input file
+    for old_file in CACHE_PATH.glob("{}_*".format(cache_stem)):
+        old_file.unlink()
+
+    try:
+        df.to_parquet(_with_extension(cache_file, ".parquet"))
+    except Exception:
+        # mixed-type columns, non-string column names or no parquet engine
+        _with_extension(cache_file, ".parquet").unlink(missing_ok=True)
+        df.to_pickle(_with_extension(cache_file, ".pkl"))
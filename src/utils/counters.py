@@ -0,0 +1,180 @@
+# counters.py
+# includes:
+# - seats_per_slot <- seats of the departing flights of each airline per 5 minutes
+# - allocate_counters <- check-in counters of each airline per 5 minutes
+# - counters_to_dataframe <- df_Counters as returned by show_up_function
+# - apply_T2_counter_rule <- max 10 counters per airline, always 10 for MM
+# - CounterSchedule <- counters of one schedule for any rule, with LRU cache
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+N_SLOTS = int(24 * 60 / 5)
+
+
+def seats_per_slot(data):
+    """
+    seats of each airline per 5 minutes slot of the day (STD rounded down)
+
+    data: departures with "Flight Number", "Scheduled Time", "SEATS FC"
+    every row counts the seats of the first row of its flight number,
+    at the STD of that first row (as the former per-flight loops)
+    returns the airline codes, in order of appearance,
+    and an (airlines x 288) array of seats
+    """
+    airline = data["Flight Number"].str.split(" ", n=1, expand=True)[0]
+    list_airline = list(dict.fromkeys(airline))
+
+    first_row = data.drop_duplicates(subset="Flight Number").set_index(
+        "Flight Number"
+    )
+    scheduled_time = data["Flight Number"].map(first_row["Scheduled Time"])
+    STD_5interval = (
+        (scheduled_time.dt.hour * 60 + scheduled_time.dt.minute) // 5
+    ).to_numpy()
+    seats = (
+        data["Flight Number"].map(first_row["SEATS FC"]).to_numpy(dtype=float)
+    )
+
+    airline_index = pd.Index(list_airline).get_indexer(airline)
+    array_seats = np.zeros((len(list_airline), N_SLOTS))
+    np.add.at(array_seats, (airline_index, STD_5interval), seats)
+    return list_airline, array_seats
+
+
+def allocate_counters(
+    array_seats,
+    start_time=2.5,
+    onecounter_time=0.75,
+    base_n_counter=4,
+    seats_per_add_counter=60,
+    fold=True,
+):
+    """
+    check-in counters of each airline per 5 minutes slot
+
+    from start_time to onecounter_time (hours) before STD, the counters
+    are given by the seats of all flights checking in on the slot:
+    max(base, base + 1 + (seats - 201) // seats_per_add_counter)
+    then until STD, 1 counter if no other flight is checking in.
+    Flights close to midnight wrap around to the previous day.
+    fold=False returns the (airlines x 3 * 288) counters of the previous,
+    busy and next days instead (see simfunc/annual.py)
+    """
+    n_airline = array_seats.shape[0]
+    onecounter_slot = -int(((onecounter_time) * 60) // 5)
+    start_slot = -int(((start_time) * 60) // 5)
+
+    # work on 3 days to avoid errors for flights close to midnight:
+    # cell p of the 3 days is slot p - N_SLOTS of the busy day
+    n_cells = 3 * N_SLOTS
+    cell = np.arange(n_cells)
+
+    def window_sum(values, first, last):
+        """sum of values[p - N_SLOTS - j] for j in range(first, last)"""
+        if last <= first:
+            return np.zeros((n_airline, n_cells))
+        prefix = np.zeros((n_airline, N_SLOTS + 1))
+        prefix[:, 1:] = np.cumsum(values, axis=1)
+        high = np.clip(cell - N_SLOTS - first + 1, 0, N_SLOTS)
+        low = np.clip(cell - N_SLOTS - last + 1, 0, N_SLOTS)
+        return prefix[:, high] - prefix[:, low]
+
+    # seats checking in from start_time to onecounter_time before STD
+    array_3d = window_sum(array_seats, start_slot, onecounter_slot)
+
+    # now we have a table with seats, let's apply the rule
+    with np.errstate(invalid="ignore"):
+        array_3d = np.where(
+            array_3d > 0,
+            np.maximum(
+                base_n_counter,
+                base_n_counter + 1 + (array_3d - 201) // seats_per_add_counter,
+            ),
+            array_3d,
+        )
+
+    # last slots before STD: 1 counter if no other flight is checking in
+    last_slots = window_sum(
+        (array_seats != 0).astype(float), onecounter_slot, 1
+    )
+    array_3d[(last_slots > 0) & (array_3d == 0)] = 1
+
+    if not fold:
+        return array_3d
+
+    # merge into only 1d
+    return (
+        array_3d[:, :N_SLOTS]
+        + array_3d[:, N_SLOTS : 2 * N_SLOTS]
+        + array_3d[:, 2 * N_SLOTS :]
+    )
+
+
+def counters_to_dataframe(list_airline, array_counters):
+    """one column of counters per airline, one row per 5 minutes, and total"""
+    df_Counters = pd.DataFrame(array_counters.T, columns=list_airline)
+    df_Counters["total"] = df_Counters.sum(axis=1)
+    return df_Counters
+
+
+def apply_T2_counter_rule(df_Counters):
+    """
+    specific allocation to T2: no more than 10 counters for each airline
+    and always 10 counters for peach (MM)
+    """
+    df_Counters = df_Counters.mask(df_Counters > 10, 10)
+    df_Counters["MM"] = df_Counters["MM"].mask(df_Counters["MM"] >= 1, 10)
+    df_Counters["total"] = df_Counters.drop(labels=["total"], axis=1).sum(
+        axis=1
+    )
+    return df_Counters
+
+
+class CounterSchedule(object):
+    """
+    check-in counters of one departure schedule for any allocation rule
+
+    the seats per airline and slot are computed once (see seats_per_slot);
+    calling the instance with a rule (start_time, onecounter_time,
+    base_n_counter, seats_per_add_counter) returns df_Counters,
+    the last `maxsize` rules being kept in an LRU cache
+    """
+
+    def __init__(self, list_airline, array_seats, maxsize=256):
+        self.list_airline = list_airline
+        self.array_seats = array_seats
+        self._counters = lru_cache(maxsize=maxsize)(self._allocate)
+
+    def __call__(
+        self,
+        start_time=2.5,
+        onecounter_time=0.75,
+        base_n_counter=4,
+        seats_per_add_counter=60,
+    ):
+        df_Counters = self._counters(
+            start_time, onecounter_time, base_n_counter, seats_per_add_counter
+        )
+        return df_Counters.copy()
+
+    def cache_info(self):
+        return self._counters.cache_info()
+
+    def _allocate(
+        self,
+        start_time,
+        onecounter_time,
+        base_n_counter,
+        seats_per_add_counter,
+    ):
+        array_counters = allocate_counters(
+            self.array_seats,
+            start_time=start_time,
+            onecounter_time=onecounter_time,
+            base_n_counter=base_n_counter,
+            seats_per_add_counter=seats_per_add_counter,
+        )
+        return counters_to_dataframe(self.list_airline, array_counters)
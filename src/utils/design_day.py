@@ -0,0 +1,204 @@
+# design_day.py
+# includes:
+# - rank_design_days <- peak hours of every date of a multi-day schedule, ranked,
+#   and the busiest hours of the whole schedule
+# - design_day <- date of the n-th busiest hour (eg. 30th busiest hour)
+# - show_up_kernel <- show-up distribution of a profile, per minute before ST
+
+import numpy as np
+import pandas as pd
+
+from src.utils.cache import input_path, read_excel_cached
+from src.utils.schedule_sources import format_schedule, load_schedule
+from src.utils.showup import flight_category, show_up_inverse_cdf
+
+# minutes of margin before the first date, for the show-up of its flights
+MARGIN = 24 * 60
+
+
+def show_up_kernel(inverse_cdf, n_quantiles=10001, start=0.0001, stop=0.995):
+    """
+    share of the Pax of a flight showing up d minutes before its ST,
+    for the quantiles start to stop used by show_up_function
+    returns the first d and the shares from that d on
+    """
+    y = np.linspace(start, stop, n_quantiles)
+    # show-up minute floor(ST - t) is ST - ceil(t) minutes
+    delay = np.ceil(inverse_cdf(y)).astype(int)
+    first = delay.min()
+    kernel = np.bincount(delay - first) / n_quantiles
+    return first, kernel
+
+
+def _rolling_hours(pax_per_minute, n_dates):
+    """
+    60 minutes sums starting at each minute of each date, shape
+    (n_dates, 24 * 60) (minutes counted from MARGIN before the first date)
+    """
+    cumsum = np.zeros(len(pax_per_minute) + 1)
+    cumsum[1:] = np.cumsum(pax_per_minute)
+    rolling = cumsum[60:] - cumsum[:-60]
+    rolling = np.concatenate([rolling, np.zeros(60)])
+    return rolling[MARGIN : MARGIN + n_dates * 24 * 60].reshape(
+        n_dates, 24 * 60
+    )
+
+
+def _busiest_hours(by_date, n_hours):
+    """
+    start (minutes from the first date) and PAX of the n_hours busiest
+    60 minutes windows, the overlapping windows counted once (the busiest)
+    """
+    rolling = by_date.ravel()
+    list_start = []
+    for start in np.argsort(-rolling, kind="mergesort"):
+        if len(list_start) == n_hours or rolling[start] <= 0:
+            break
+        if all(abs(start - other) >= 60 for other in list_start):
+            list_start.append(start)
+    return np.array(list_start, dtype=int), rolling[list_start]
+
+
+def rank_design_days(schedule, sector="I", show_up=True, n_hours=100):
+    """
+    peak hours of every date and terminal of a processed schedule
+
+    schedule: path of a processed schedule file, or schedule DataFrame
+    (see utils/schedule_sources.py)
+
+    for each (Flight Date, terminal):
+        - peak_STD, peak_STA: highest scheduled PAX over 60 consecutive
+          minutes starting on that date (windows can cross midnight)
+        - peak_show_up: same for the expected terminal show-up of the
+          departing Pax (terminal profiles, flights after midnight
+          counted the evening before)
+        - rank_STD, rank_STA, rank_show_up: rank of the date in its
+          terminal, 1 for the busiest
+    all dates are computed at once with prefix sums on one minute
+    timeline spanning the whole schedule
+
+    df_days.attrs["hours"]: the n_hours busiest hours of each terminal and
+    peak column of the whole schedule (terminal, by, rank, start, PAX),
+    ranking every 60 minutes window, the overlapping ones counted once
+    (several busy hours of one day are all ranked, see design_day)
+    """
+    if isinstance(schedule, pd.DataFrame):
+        data = format_schedule(schedule)
+    else:
+        data = load_schedule(schedule)
+    data = data[
+        (data["Category(P/C/O)"] == "P") & (data["Sector"] == sector)
+    ].reset_index(drop=True)
+
+    flight_date = pd.to_datetime(data["Flight Date"]).dt.normalize()
+    first_date = flight_date.min()
+    n_dates = (flight_date.max() - first_date).days + 1
+    n_minutes = MARGIN + (n_dates + 1) * 24 * 60
+    minute = (
+        MARGIN
+        + (flight_date - first_date).dt.days.to_numpy() * 24 * 60
+        + data["Scheduled Time"].dt.hour.to_numpy() * 60
+        + data["Scheduled Time"].dt.minute.to_numpy()
+    )
+    pax = data["PAX_SUM FC"].fillna(0).to_numpy(dtype=float)
+
+    if show_up:
+        path_show_up = input_path("ADRM_param_full_path")
+        airline_code = read_excel_cached(
+            path_show_up, sheet_name=r"airline_code", header=0
+        )
+        category = flight_category(data, airline_code, "terminal")
+        inverse_cdf = show_up_inverse_cdf(path_show_up, system="terminal")
+
+    list_df = []
+    list_hours = []
+
+    def add_hours(by_date, terminal, by):
+        start, pax_hour = _busiest_hours(by_date, n_hours)
+        list_hours.append(
+            pd.DataFrame(
+                {
+                    "terminal": terminal,
+                    "by": by,
+                    "rank": np.arange(1, len(start) + 1),
+                    "start": first_date + pd.to_timedelta(start, unit="m"),
+                    "PAX": pax_hour,
+                }
+            )
+        )
+
+    for terminal in sorted(data["T1/T2(MM/9C/7C/TW)"].dropna().unique()):
+        is_terminal = (data["T1/T2(MM/9C/7C/TW)"] == terminal).to_numpy()
+        df_terminal = pd.DataFrame(
+            {
+                "Flight Date": pd.date_range(first_date, periods=n_dates),
+                "terminal": terminal,
+            }
+        )
+
+        for direction in ["D", "A"]:
+            mask = is_terminal & (data["A/D"] == direction).to_numpy()
+            pax_per_minute = np.bincount(
+                minute[mask], weights=pax[mask], minlength=n_minutes
+            )
+            by_date = _rolling_hours(pax_per_minute, n_dates)
+            df_terminal["peak_ST{}".format(direction)] = by_date.max(axis=1)
+            add_hours(by_date, terminal, "peak_ST{}".format(direction))
+            df_terminal["PAX_ST{}".format(direction)] = (
+                pax_per_minute[MARGIN : MARGIN + n_dates * 24 * 60]
+                .reshape(n_dates, 24 * 60)
+                .sum(axis=1)
+            )
+
+            if show_up and direction == "D":
+                # expected show-up per minute: PAX of each category
+                # spread by its show-up distribution
+                show_up_per_minute = np.zeros(n_minutes)
+                for cat in np.unique(category[mask]):
+                    mask_cat = mask & (category == cat)
+                    pax_cat = np.bincount(
+                        minute[mask_cat],
+                        weights=pax[mask_cat],
+                        minlength=n_minutes,
+                    )
+                    first, kernel = show_up_kernel(inverse_cdf[cat])
+                    # show_up[t] = sum_i kernel[i] * pax[t + first + i]
+                    full = np.convolve(pax_cat, kernel[::-1])
+                    index = np.arange(n_minutes) + first + len(kernel) - 1
+                    valid = (index >= 0) & (index < len(full))
+                    show_up_per_minute[valid] += full[index[valid]]
+                by_date = _rolling_hours(show_up_per_minute, n_dates)
+                df_terminal["peak_show_up"] = by_date.max(axis=1)
+                add_hours(by_date, terminal, "peak_show_up")
+
+        list_df.append(df_terminal)
+
+    df_days = pd.concat(list_df, ignore_index=True)
+    for column in ["peak_STD", "peak_STA", "peak_show_up"]:
+        if column in df_days.columns:
+            df_days["rank_{}".format(column[5:])] = (
+                df_days.groupby("terminal")[column]
+                .rank(ascending=False, method="first")
+                .astype(int)
+            )
+    df_days.attrs["hours"] = pd.concat(list_hours, ignore_index=True)
+    return df_days
+
+
+def design_day(df_days, rank=30, by="peak_STD", terminal="T1"):
+    """
+    date (str) of the `rank`-th busiest hour of terminal by `by`
+    (30th busiest hour convention: every hour of the schedule is ranked,
+    not only the peak hour of each day, see rank_design_days);
+    feeds generate_dep_Pax_Counters(date_str=...) or the *_dates functions
+    """
+    df_hours = df_days.attrs["hours"]
+    df_hours = df_hours[
+        (df_hours["terminal"] == terminal) & (df_hours["by"] == by)
+    ]
+    if rank > len(df_hours):
+        raise ValueError(
+            "only {} hours ranked for {} {}, see rank_design_days "
+            "n_hours".format(len(df_hours), terminal, by)
+        )
+    return df_hours["start"].iloc[rank - 1].strftime("%Y-%m-%d")
@@ -0,0 +1,77 @@
+# early_stop.py
+# includes:
+# - run_until <- run a simulation, stopping early when a condition is met
+# - queue_above <- condition: queue of a station longer than a threshold
+# - wait_above <- condition: quantile of a station wait time proven above target
+# - aborted_cost <- bounded cost of a run stopped early
+
+import numpy as np
+
+
+def run_until(
+    env, until, stop_condition=None, creator=None, df_result=None, step=5
+):
+    """
+    run env until `until` (minutes)
+
+    with a stop_condition, the run is checked every `step` minutes and
+    stops as soon as stop_condition(env, creator, df_result) is True
+    (creator is the departure_creator / arrival_creator of the model and
+    df_result the results filled during the run, times in minutes)
+
+    returns the time at which the run stopped, None if it was not stopped
+    """
+    if stop_condition is None:
+        env.run(until=until)
+        return None
+
+    for t in np.arange(step, until + step, step):
+        env.run(until=min(t, until))
+        if stop_condition(env, creator, df_result):
+            return env.now
+    return None
+
+
+def queue_above(station, threshold):
+    """
+    stop condition: more than threshold Pax in the queue of station
+    (a resource of the creator, eg. "security_lanes";
+    a list of resources, eg. "checkin", counts all their queues)
+    """
+
+    def condition(env, creator, df_result):
+        value = getattr(creator, station)
+        resources = value if isinstance(value, list) else [value]
+        return sum(len(resource.queue) for resource in resources) > threshold
+
+    return condition
+
+
+def wait_above(station, target_wait_time, quantile=0.90):
+    """
+    stop condition: the quantile (P90) wait time of station is already
+    certain to end above target_wait_time (minutes)
+
+    station is the name in the columns of df_result, eg. "security" for
+    start_security_queue and end_security_queue. Pax that waited, or are
+    still waiting, more than the target are counted; once they are more
+    than (1 - quantile) of all the Pax of the day, the quantile of the
+    whole day can only be above target
+    """
+
+    def condition(env, creator, df_result):
+        start = df_result["start_{}_queue".format(station)]
+        end = df_result["end_{}_queue".format(station)].fillna(env.now)
+        n_above = ((end - start) > target_wait_time).sum()
+        return n_above >= (1 - quantile) * len(df_result) + 1
+
+    return condition
+
+
+def aborted_cost(target_wait_time, aborted):
+    """
+    cost of a run stopped at time aborted (minutes): above the cost of
+    any run where Pax wait at most 14 hours, and higher when it stopped
+    earlier, so that the optimizers still see which N is less hopeless
+    """
+    return (1 + 1 / 10000) * (14 * 60 - target_wait_time) ** 2 + 1 / aborted
@@ -6,11 +6,14 @@ def calculate_EBS_LBC(
     df_result,
     MUP_open_time=pd.Timedelta(hours=2, minutes=10),
     MUP_close_time=pd.Timedelta(hours=1),
+    continuous=False,
 ):
     # change the times after midnight to the next day to calculate properly
-    end = pd.Timestamp("2020-10-13 02:00:00")
-    mask_late_flight = df_result["STD"] < end
-    df_result.loc[mask_late_flight, "STD"] += pd.Timedelta(days=1)
+    # (not for continuous results, their STD are absolute already)
+    if not continuous:
+        end = pd.Timestamp("2020-10-13 02:00:00")
+        mask_late_flight = df_result["STD"] < end
+        df_result.loc[mask_late_flight, "STD"] += pd.Timedelta(days=1)
 
     # mask for bags who will use EBS
     # we take start security queue because some come from checkin and some from CUSBD
@@ -82,16 +85,21 @@ def calculate_EBS_LBC(
     return EBS_req, LBC_req
 
 
-def calculate_avg_dwell_time(df_result, offset=pd.Timedelta(minutes=15)):
+def calculate_avg_dwell_time(
+    df_result, offset=pd.Timedelta(minutes=15), continuous=False
+):
     """
     we could use: df_result[["end_emigration_self_process", "end_emigration_counter_process"]]
     but as we do not consider immigration here (check-in study)
     let's consider Pax take about 15 minutes to clear immigration
+    continuous: df_result of a run with an origin (see simfunc.horizon)
     """
     # change the times after midnight to the next day to calculate properly
-    end = pd.Timestamp("2020-10-13 02:00:00")
-    mask_late_flight = df_result["STD"] < end
-    df_result.loc[mask_late_flight, "STD"] += pd.Timedelta(days=1)
+    # (not for continuous results, their STD are absolute already)
+    if not continuous:
+        end = pd.Timestamp("2020-10-13 02:00:00")
+        mask_late_flight = df_result["STD"] < end
+        df_result.loc[mask_late_flight, "STD"] += pd.Timedelta(days=1)
 
     df_dwell = df_result["STD"] - (df_result["end_security_process"] + offset)
 
@@ -109,11 +117,14 @@ def calculate_avg_dwell_time(df_result, offset=pd.Timedelta(minutes=15)):
 def calculate_EBS_modern_pax_only(
     df_result,
     MUP_open_time=pd.Timedelta(hours=2, minutes=30),
+    continuous=False,
 ):
     # change the times after midnight to the next day to calculate properly
-    end = pd.Timestamp("2020-10-13 02:00:00")
-    mask_late_flight = df_result["STD"] < end
-    df_result.loc[mask_late_flight, "STD"] += pd.Timedelta(days=1)
+    # (not for continuous results, their STD are absolute already)
+    if not continuous:
+        end = pd.Timestamp("2020-10-13 02:00:00")
+        mask_late_flight = df_result["STD"] < end
+        df_result.loc[mask_late_flight, "STD"] += pd.Timedelta(days=1)
 
     # mask for bags who will use EBS
     # we take start security queue because some come from checkin and some from CUSBD
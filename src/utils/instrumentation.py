@@ -0,0 +1,181 @@
+# instrumentation.py
+# includes:
+# - SimStats <- opt-in statistics of one simulation run
+# - aggregate_stats <- gather the SimStats of several runs in a DataFrame
+
+import time
+from collections import Counter
+
+import pandas as pd
+import simpy
+
+
+class SimStats(object):
+    """
+    Opt-in instrumentation of one simulation run.
+
+    Pass an instance as `stats=` to a simulation function (eg. KIX_T1d)
+    and read it once the function returns. When `stats` is None,
+    the simulation functions skip all instrumentation.
+
+    collected for the run:
+        - phase_time: wall time in seconds of each phase
+          (input_prep, generator_setup, env_run, formatting, plotting,
+          saving of the parameters and Excel results, kpi)
+        - n_events: number of SimPy events processed
+        - station_requests: number of requests made to each station
+        - process_yields: number of yields of each generator function,
+          ie. per Pax type (Pax_traditional, Pax_modern...)
+          and per station process (security_screening, wait_opening...)
+    """
+
+    def __init__(self, label=None):
+        self.label = label
+        self.phase_time = {}
+        self.n_events = 0
+        self.station_requests = Counter()
+        self.process_yields = Counter()
+        self._t_lap = time.perf_counter()
+
+    def start(self):
+        """(re)start the clock of the first phase"""
+        self._t_lap = time.perf_counter()
+
+    def lap(self, phase):
+        """add the time elapsed since the previous lap to `phase`"""
+        t_now = time.perf_counter()
+        self.phase_time[phase] = (
+            self.phase_time.get(phase, 0) + t_now - self._t_lap
+        )
+        self._t_lap = t_now
+
+    def environment(self, initial_time=0):
+        """simpy.Environment counting its events and process yields"""
+        return _CountingEnvironment(self, initial_time=initial_time)
+
+    def track(self, creator):
+        """
+        count the requests made to every resource of a
+        departure_creator / arrival_creator
+        lists of resources (eg. one check-in per airline) count as one station
+        """
+        for station, value in vars(creator).items():
+            resources = value if isinstance(value, list) else [value]
+            for resource in resources:
+                if isinstance(resource, simpy.resources.base.BaseResource):
+                    self._track_resource(station, resource)
+
+    def _track_resource(self, station, resource):
+        request = resource.request
+
+        def counted_request(*args, **kwargs):
+            self.station_requests[station] += 1
+            return request(*args, **kwargs)
+
+        resource.request = counted_request
+
+    @property
+    def total_time(self):
+        return sum(self.phase_time.values())
+
+    @property
+    def events_per_sec(self):
+        run_time = self.phase_time.get("env_run", 0)
+        if run_time == 0:
+            return float("nan")
+        return self.n_events / run_time
+
+    @property
+    def pax_type_yields(self):
+        return {
+            name: n
+            for name, n in self.process_yields.items()
+            if name.startswith("Pax_") and name != "Pax_generator"
+        }
+
+    def to_dict(self):
+        """flat dictionnary of the run statistics, one key per figure"""
+        dct_stats = {
+            "label": self.label,
+            "n_events": self.n_events,
+            "events_per_sec": self.events_per_sec,
+            "total_time": self.total_time,
+        }
+        dct_stats.update(
+            {"time_{}".format(k): v for k, v in self.phase_time.items()}
+        )
+        dct_stats.update(
+            {
+                "requests_{}".format(k): v
+                for k, v in self.station_requests.items()
+            }
+        )
+        dct_stats.update(
+            {"yields_{}".format(k): v for k, v in self.process_yields.items()}
+        )
+        return dct_stats
+
+    def __repr__(self):
+        return (
+            "SimStats(label={}, n_events={}, events_per_sec={:.0f}, "
+            "total_time={:.2f}s)".format(
+                self.label,
+                self.n_events,
+                self.events_per_sec,
+                self.total_time,
+            )
+        )
+
+
+def aggregate_stats(list_stats):
+    """
+    one row per run, one column per figure of SimStats.to_dict
+    missing figures (eg. a station absent from a model) are set to 0
+    """
+    df_stats = pd.DataFrame([stats.to_dict() for stats in list_stats])
+    counted = [
+        col
+        for col in df_stats.columns
+        if col.startswith("requests_") or col.startswith("yields_")
+    ]
+    df_stats[counted] = df_stats[counted].fillna(0)
+    return df_stats
+
+
+class _CountingEnvironment(simpy.Environment):
+    """simpy.Environment which reports its activity to a SimStats"""
+
+    def __init__(self, stats, initial_time=0):
+        super().__init__(initial_time=initial_time)
+        self._stats = stats
+
+    def step(self):
+        super().step()
+        self._stats.n_events += 1
+
+    def process(self, generator):
+        return simpy.Process(
+            self, _counted(generator, self._stats.process_yields)
+        )
+
+
+def _counted(generator, counter):
+    """
+    drive `generator` exactly like simpy would,
+    counting its yields under the name of its function
+    """
+    name = generator.__name__
+    value, error = None, None
+    while True:
+        try:
+            if error is None:
+                event = generator.send(value)
+            else:
+                event = generator.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        counter[name] += 1
+        try:
+            value, error = (yield event), None
+        except BaseException as exception:
+            value, error = None, exception
@@ -0,0 +1,138 @@
+# journal.py
+# includes:
+# - EvaluationJournal <- evaluations of a cost function, each x run once
+#   (in memory, optionally stored in a SQLite file to resume)
+
+import json
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+class EvaluationJournal(object):
+    """
+    journal of the evaluations of a cost function (eg. a simulation)
+
+    calling the journal with x returns fun(x), running fun only for the
+    x not evaluated yet; requested counts the calls and executed the runs
+    they needed, recorded the runs made outside the journal (see record).
+    With a path, the evaluations are also written to a SQLite file under
+    `name`: a new journal with the same path and name starts with them,
+    so an interrupted optimization resumes where it stopped
+    (name should identify the cost function and its parameters)
+    x is a number, or a list of numbers for several variables (eg. a grid)
+    """
+
+    def __init__(self, fun, path=None, name="default"):
+        self.fun = fun
+        self.path = path
+        self.name = name
+        self.values = {}
+        self.requested = 0
+        self.executed = 0
+        self.recorded = 0
+        self.cancelled = 0
+        self.loaded = 0
+        # keys run ahead of a request and not requested yet
+        self.ahead = set()
+
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._execute(
+                "CREATE TABLE IF NOT EXISTS evaluations "
+                "(name TEXT, x TEXT, y REAL, PRIMARY KEY (name, x))"
+            )
+            rows = self._execute(
+                "SELECT x, y FROM evaluations WHERE name = ?", (name,)
+            )
+            for x, y in rows:
+                self.values[_key(json.loads(x))] = y
+            self.loaded = len(rows)
+
+    def __call__(self, x):
+        self.requested += 1
+        key = _key(x)
+        if key not in self.values:
+            self.executed += 1
+            self._store(key, self.fun(x))
+        self.ahead.discard(key)
+        return self.values[key]
+
+    def __contains__(self, x):
+        return _key(x) in self.values
+
+    def record(self, x, y, ahead=False):
+        """
+        add an evaluation made outside the journal (eg. by a worker),
+        ahead: run speculatively, before being requested
+        """
+        self.recorded += 1
+        if ahead:
+            self.ahead.add(_key(x))
+        self._store(_key(x), y)
+
+    def cancel(self, n=1):
+        """count n runs started for the journal and cancelled"""
+        self.cancelled += n
+
+    def summary(self):
+        """
+        requested evaluations, simulations executed for them (saved: the
+        requests answered without a run), simulations recorded outside
+        the journal (unused: run ahead and never requested), simulations
+        cancelled and values loaded
+        """
+        return {
+            "requested": self.requested,
+            "executed": self.executed,
+            "saved": self.requested - self.executed,
+            "recorded": self.recorded,
+            "unused": len(self.ahead),
+            "cancelled": self.cancelled,
+            "loaded": self.loaded,
+        }
+
+    def to_frame(self, columns=None):
+        """
+        DataFrame of the evaluations: x in columns (named by columns,
+        eg. the variables of a grid, x or x0, x1... if None) and y
+        """
+        list_x = [x if isinstance(x, tuple) else (x,) for x in self.values]
+        if columns is None:
+            width = len(list_x[0]) if list_x else 1
+            columns = (
+                ["x"]
+                if width == 1
+                else ["x{}".format(i) for i in range(width)]
+            )
+        df = pd.DataFrame(list_x, columns=list(columns))
+        df["y"] = list(self.values.values())
+        return df
+
+    def _store(self, key, y):
+        self.values[key] = y
+        if self.path is not None:
+            self._execute(
+                "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?)",
+                (self.name, json.dumps(key), float(y)),
+            )
+
+    def _execute(self, sql, parameters=()):
+        connection = sqlite3.connect(str(self.path))
+        try:
+            with connection:
+                return connection.execute(sql, parameters).fetchall()
+        finally:
+            connection.close()
+
+
+def _key(x):
+    """same key for 12, 12.0 and numpy integers, tuple for several x"""
+    if isinstance(x, (list, tuple, np.ndarray)):
+        return tuple(_key(value) for value in x)
+    if isinstance(x, str):
+        return x
+    x = float(x)
+    return int(x) if x.is_integer() else x
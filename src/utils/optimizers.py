@@ -1,12 +1,30 @@
 # utils.py
 # includes:
-# - custmin <- custom minimizer
+# - custmin <- custom minimizer (each x simulated once, see utils/journal.py)
+# - custmin_speculative <- custmin with the next evaluations run in parallel
 # - custcallnack <- custom callback for minimizer
+# - custmin_multicore <- asynchronous parallel minimizer (ray), bracketing
+#   the minimum and keeping every core busy
+# - univariate_wait_time_function <- x -> P90 wait time of one system
+# - min_resource <- smallest N meeting a target wait time (exponential
+#   bracketing then parallel k-ary search)
+# - min_resources <- smallest N of several systems of one model together,
+#   every run informing all of them
+# - bayesian_minimize <- Gaussian process optimizer for continuous
+#   variables, batches of points evaluated in parallel
+# - grid_search <- every point of a grid evaluated in parallel, journaled
+#   to resume an interrupted search
+
+import itertools
 
 from scipy.optimize import OptimizeResult
+from scipy import stats as st
 import matplotlib.pyplot as plt
+import numpy as np
 import ray
 
+from src.utils.journal import EvaluationJournal
+
 
 def custmin(
     fun,
@@ -16,9 +34,15 @@ def custmin(
     smallstep=None,
     callback=None,
     tol=1,
+    journal=None,
 ):
+    # journal of the evaluations: x already evaluated are not simulated again
+    # pass EvaluationJournal(fun, path=...) to resume an interrupted run
+    if journal is None:
+        journal = EvaluationJournal(fun)
+
     bestx = guess
-    besty = fun(bestx)
+    besty = journal(bestx)
     fev_list = []
     fev_list.append((bestx, besty))
     funcalls = 1
@@ -51,7 +75,7 @@ def custmin(
             niter += 1
             improved = False
             for testx in [max(1, bestx - stepsize), max(1, bestx + stepsize)]:
-                testy = fun(testx)
+                testy = journal(testx)
                 fev_list.append((testx, testy))
                 funcalls += 1
                 if callback is not None:
@@ -94,7 +118,7 @@ def custmin(
             niter += 1
             improved = False
             for testx in [max(bestx - stepsize, 1), max(bestx + stepsize, 1)]:
-                testy = fun(testx)
+                testy = journal(testx)
                 fev_list.append((testx, testy))
                 funcalls += 1
                 if callback is not None:
@@ -131,7 +155,7 @@ def custmin(
 
         improved = False
         testx = bestx + stepsize
-        testy = fun(testx)
+        testy = journal(testx)
         fev_list.append((testx, testy))
         niter += 1
         funcalls += 1
@@ -178,10 +202,128 @@ def custmin(
     )
 
     return OptimizeResult(
-        fun=besty, x=bestx, nit=niter, nfev=funcalls, success=(niter >= 1)
+        fun=besty,
+        x=bestx,
+        nit=niter,
+        nfev=funcalls,
+        nsim=journal.executed + journal.recorded,
+        journal=journal.summary(),
+        success=(niter >= 1),
     )
 
 
+def custmin_speculative(
+    fun,
+    guess=20,
+    maxfev=None,
+    bigstep=None,
+    smallstep=None,
+    callback=None,
+    tol=1,
+    journal=None,
+    N_core=None,
+):
+    """
+    custmin with its evaluations run ahead in parallel (ray)
+
+    the decisions are those of custmin (same x, same result), but when custmin
+    asks for an x, the points it may ask next are submitted at the same time:
+    the probes bestx +/- bigstep and smallstep around the current and the
+    previous best x, and the next points of the continuation in the current
+    direction; up to N_core simulations run at once (all CPUs of ray if None)
+    and those not likely anymore are cancelled; the simulations finished
+    ahead are kept in the journal (nsim counts them, ncancelled the others,
+    journal["unused"] those custmin never asked for)
+    """
+
+    # adapt ray to function
+    @ray.remote
+    def f(x):
+        return fun(x)
+
+    if journal is None:
+        journal = EvaluationJournal(fun)
+    if N_core is None:
+        N_core = max(1, int(ray.cluster_resources().get("CPU", 1)))
+
+    dct_future = {}
+
+    def likely_next(x):
+        # best x known before x, custmin moves from it or from x
+        list_center = [x]
+        if journal.values:
+            best_known = min(journal.values, key=journal.values.get)
+            list_center.append(best_known)
+        list_step = [step for step in [bigstep, smallstep] if step]
+        list_x = [
+            max(1, center + sign * step)
+            for step in list_step
+            for center in list_center
+            for sign in [-1, 1]
+        ]
+        # continuation: next points in the direction of the last move
+        if len(list_center) == 2 and list_center[1] != x:
+            direction = x - list_center[1]
+            list_x += [max(1, x + k * direction) for k in range(1, N_core)]
+        return list(dict.fromkeys(list_x))
+
+    def record_ready(exclude=None):
+        # results arrived meanwhile
+        if not dct_future:
+            return
+        list_ready, _ = ray.wait(
+            list(dct_future.values()), num_returns=len(dct_future), timeout=0
+        )
+        for other, future in list(dct_future.items()):
+            if future in list_ready and other != exclude:
+                journal.record(other, ray.get(future), ahead=True)
+                del dct_future[other]
+
+    def speculative_fun(x):
+        record_ready(exclude=x)
+
+        # x first, then the points custmin may ask next
+        list_x = [x] + [
+            other
+            for other in likely_next(x)
+            if other != x and other not in journal
+        ]
+        list_x = list_x[:N_core]
+        for other in list(dct_future):
+            if other not in list_x:
+                ray.cancel(dct_future.pop(other))
+                journal.cancel()
+        for other in list_x:
+            if other not in dct_future:
+                dct_future[other] = f.remote(other)
+        return ray.get(dct_future.pop(x))
+
+    fun_journal = journal.fun
+    journal.fun = speculative_fun
+    try:
+        result = custmin(
+            fun,
+            guess=guess,
+            maxfev=maxfev,
+            bigstep=bigstep,
+            smallstep=smallstep,
+            callback=callback,
+            tol=tol,
+            journal=journal,
+        )
+    finally:
+        journal.fun = fun_journal
+        record_ready()
+        for future in dct_future.values():
+            ray.cancel(future)
+        journal.cancel(len(dct_future))
+
+    result.nsim = journal.executed + journal.recorded
+    result.journal = journal.summary()
+    result.ncancelled = journal.cancelled
+    return result
+
+
 def custcallback(
     error=None, x=None, nit=None, nfev=None, stepsize=None, fev_list=None
 ):
@@ -212,97 +354,123 @@ def custmin_multicore(
     N_core=None,
     callback=None,
     tol=1,
+    journal=None,
 ):
+    """
+    asynchronous search of the integer x minimizing fun (ray), for a cost
+    decreasing then increasing with x (eg. over and under capacity)
+
+    the minimum is bracketed between the nearest points evaluated on each
+    side of the best x; as soon as one simulation finishes, the next point
+    of the bracket is submitted (nearest to the best x first, downhill side
+    first), so the N_core cores stay busy, no x is evaluated twice, and the
+    simulations left out of the bracket are cancelled. Finished when fun
+    is below tol or when every point of the bracket is evaluated
+    N_core: simulations at once (all CPUs of ray if None)
+    returns (bestx, besty, finished, all_x, all_y) with all_x, all_y the
+    evaluations in the order they finished (see custcallback_multicore)
+    """
+
     # adapt ray to function
     @ray.remote
     def f(x):
         return fun(x)
 
-    # initialize list of results
-    all_x = []
-    all_y = []
-    loop = 0
+    if journal is None:
+        journal = EvaluationJournal(fun)
+    if N_core is None:
+        N_core = max(1, int(ray.cluster_resources().get("CPU", 1)))
 
-    # initialized finished as false
+    # initialize list of results (values already in the journal first)
+    all_x = list(journal.values)
+    all_y = list(journal.values.values())
+    dct_future = {}
+    loop = 0
     finished = False
 
-    # determine initial xmin and xmax
-    xmin = int(max(1, guess - N_core / 2))
-    xmax = int(guess + N_core / 2)
-
-    # loop
-    while finished == False:
-        # build updated x_eval_list
-        x_eval_list = [i for i in range(xmin, xmax, 1)]
-        all_x.extend(x_eval_list)
-
-        # evaluate all points in parallel
-        futures = [f.remote(i) for i in x_eval_list]
-        results = ray.get(futures)
-        all_y.extend(results)
+    def bracket():
+        # best x and nearest evaluated points on each side (None: unbounded)
+        if not journal.values:
+            return guess, None, None, None
+        bestx = min(journal.values, key=journal.values.get)
+        left = [x for x in journal.values if x < bestx]
+        right = [x for x in journal.values if x > bestx]
+        return (
+            bestx,
+            journal.values[bestx],
+            max(left) if left else None,
+            min(right) if right else None,
+        )
 
-        # evaluate where is the min
-        besty = min(results)
-        index = results.index(besty)
-        bestx = x_eval_list[index]
+    def candidates(n):
+        # next points of the bracket not evaluated nor running
+        bestx, _, left, right = bracket()
+        low = 1 if left is None else left + 1
+        # downhill side first: the side without bound
+        list_sign = [1, -1] if left is not None and right is None else [-1, 1]
+        list_x = [] if bestx in journal.values else [bestx]
+        k = 1
+        while len(list_x) < n:
+            list_side = [
+                bestx + sign * k
+                for sign in list_sign
+                if low <= bestx + sign * k
+                and (right is None or bestx + sign * k < right)
+            ]
+            if not list_side:
+                break
+            list_x += [
+                x
+                for x in list_side
+                if x not in journal.values and x not in dct_future
+            ]
+            k += 1
+        return list_x[:n]
 
+    while True:
+        bestx, besty, left, right = bracket()
         # if tolerance is met
-        if besty < tol:
+        if besty is not None and besty < tol:
             finished = True
-            callback(
-                all_x,
-                all_y,
-                bestx,
-                besty,
-                finished,
-                loop,
-            )
             break
 
-        # if index is the min of x_eval_list
-        if index == 0:
-            callback(
-                all_x,
-                all_y,
-                bestx,
-                besty,
-                finished,
-                loop,
-            )
-            xmax = bestx + 1
-            xmin = int(max(1, xmax - N_core))
-            finished = False
-            loop += 1
+        # cancel what fell out of the bracket
+        for x in list(dct_future):
+            if (left is not None and x <= left) or (
+                right is not None and x >= right
+            ):
+                ray.cancel(dct_future.pop(x))
+                journal.cancel()
 
-        # if index is the min of x_eval_list
-        elif index == len(x_eval_list) - 1:
-            callback(
-                all_x,
-                all_y,
-                bestx,
-                besty,
-                finished,
-                loop,
-            )
-            xmin = bestx
-            xmax = xmin + N_core
-            finished = False
-            loop += 1
+        # keep every core busy
+        for x in candidates(N_core - len(dct_future)):
+            dct_future[x] = f.remote(x)
 
-        # if we did not reach tol but the min is inside the segment
-        # we finish
-        else:
-            finished = True
-            callback(
-                all_x,
-                all_y,
-                bestx,
-                besty,
-                finished,
-                loop,
-            )
+        # if the min is inside the bracket and every point of it is known
+        if not dct_future:
+            finished = besty is not None
             break
 
+        # wait for the first simulation to finish
+        list_ready, _ = ray.wait(list(dct_future.values()), num_returns=1)
+        for x, future in list(dct_future.items()):
+            if future in list_ready:
+                y = ray.get(dct_future.pop(x))
+                journal.record(x, y)
+                all_x.append(x)
+                all_y.append(y)
+                loop += 1
+                # new best x
+                if callback is not None and (besty is None or y < besty):
+                    callback(all_x, all_y, x, y, finished, loop)
+
+    for future in dct_future.values():
+        ray.cancel(future)
+    journal.cancel(len(dct_future))
+
+    if callback is not None:
+        callback(all_x, all_y, bestx, besty, finished, loop)
+
     return (
         bestx,
         besty,
@@ -312,6 +480,592 @@ def custmin_multicore(
     )
 
 
+def univariate_wait_time_function(
+    model, variable_string, dct_param, quantile=0.90
+):
+    """
+    function x -> P90 (quantile) wait time in minutes of the system of
+    variable_string (eg. N_security_lanes -> security_lanes) when model
+    (eg. KIX_T1d) is run with dct_param and variable_string = x
+    (see min_resource)
+    a run stopped by a stop_condition of dct_param (see utils.early_stop)
+    gives the 14 hours wait of Pax not processed
+    """
+    system_string = variable_string.split("_", 1)[1]
+
+    def wait_time_function(x):
+        dct_run = dict(dct_param, **{variable_string: x})
+        dct_run["df_Pax"] = dct_run["df_Pax"].copy()
+        df_result, _, dct_hist_wait_time, _ = model(**dct_run)
+        if getattr(df_result, "attrs", {}).get("aborted") is not None:
+            return 14 * 60
+        return dct_hist_wait_time[system_string].quantile(q=quantile)
+
+    return wait_time_function
+
+
+def _bracket(dct_values, target_wait_time):
+    """
+    (lower, upper): smallest x known to meet the target (None if none)
+    and largest x below it known not to meet it (0 if none)
+    """
+    list_upper = [x for x, y in dct_values.items() if y <= target_wait_time]
+    upper = min(list_upper, default=None)
+    list_lower = [
+        x
+        for x, y in dct_values.items()
+        if y > target_wait_time and (upper is None or x < upper)
+    ]
+    return max(list_lower, default=0), upper
+
+
+def _next_candidates(lower, upper, guess, k, xmax):
+    """
+    k - 1 points to evaluate next: exponential growth from guess (or from
+    twice lower) while upper is unknown, else cut points of the bracket
+    (k-ary search); empty when the bracket is closed or xmax is reached
+    """
+    if upper is None:
+        if lower >= xmax:
+            return []
+        # from 1 at least, 2 * 0 would repeat x = 0 forever
+        start = max(1, guess if lower < guess else 2 * lower)
+        return list(
+            dict.fromkeys(min(start * 2**i, xmax) for i in range(k - 1))
+        )
+    list_cut = [
+        lower + max(1, round(j * (upper - lower) / k)) for j in range(1, k)
+    ]
+    return list(dict.fromkeys(x for x in list_cut if x < upper))
+
+
+def min_resource(
+    fun,
+    target_wait_time,
+    guess=8,
+    k=None,
+    xmax=1024,
+    parallel=True,
+    callback=None,
+    journal=None,
+    screen=None,
+    screen_margin=5,
+):
+    """
+    smallest integer x with fun(x) <= target_wait_time, for fun
+    non-increasing in x (eg. P90 wait time against N_security_lanes,
+    see univariate_wait_time_function)
+
+    the smallest x meeting the target is bracketed by exponential growth
+    (k - 1 points guess, 2 * guess, 4 * guess... per round), then the
+    bracket is cut in k parts per round (k-ary search), its k - 1
+    cut points evaluated at once: the number of rounds grows with the log
+    of x (base k) instead of linearly
+    k: k - 1 evaluations per round (CPUs of ray + 1 if None)
+    xmax: give up above xmax (success False)
+    parallel: evaluate each round in parallel with ray
+    callback: called after each round with
+    (nit=, lower=, upper=, fev_list=), lower the largest x known above
+    the target, upper the smallest x known below it (None if not found yet)
+    screen: fast estimate of fun (eg. univariate_wait_time_function of
+    simfunc.fluid.fluid_T1d), searched first: its smallest x meeting the
+    target is the guess, and the x where it exceeds the target by more
+    than screen_margin (minutes) are taken as above the target without
+    running fun
+    """
+    if journal is None:
+        journal = EvaluationJournal(fun)
+    if k is None:
+        k = 1 + max(1, int(ray.cluster_resources().get("CPU", 1)))
+    k = max(2, k)
+
+    dct_screen = {}
+    if screen is not None:
+        # x clearly above the target, and guess, with the screen
+        clear = min_resource(
+            screen, target_wait_time + screen_margin, guess, k, xmax, False
+        ).x
+        meet = min_resource(screen, target_wait_time, guess, k, xmax, False).x
+        if clear is not None and clear > 1:
+            dct_screen = {clear - 1: np.inf}
+        if meet is not None:
+            guess = meet
+
+    if parallel:
+        # adapt ray to function
+        @ray.remote
+        def f(x):
+            return fun(x)
+
+    def evaluate(list_x):
+        list_x = [x for x in dict.fromkeys(list_x) if x not in journal]
+        if parallel:
+            list_y = ray.get([f.remote(x) for x in list_x])
+            for x, y in zip(list_x, list_y):
+                journal.record(x, y)
+        else:
+            for x in list_x:
+                journal(x)
+        fev_list.extend((x, journal.values[x]) for x in list_x)
+
+    fev_list = []
+    niter = 0
+    while True:
+        lower, upper = _bracket(
+            {**dct_screen, **journal.values}, target_wait_time
+        )
+        list_x = _next_candidates(lower, upper, guess, k, xmax)
+        if not list_x:
+            break
+        niter += 1
+        evaluate(list_x)
+        if callback is not None:
+            lower, upper = _bracket(
+                {**dct_screen, **journal.values}, target_wait_time
+            )
+            callback(nit=niter, lower=lower, upper=upper, fev_list=fev_list)
+
+    return OptimizeResult(
+        x=upper,
+        fun=journal.values[upper] if upper is not None else None,
+        nit=niter,
+        nfev=len(fev_list),
+        nsim=journal.executed + journal.recorded,
+        journal=journal.summary(),
+        success=upper is not None,
+    )
+
+
+def min_resources(
+    model,
+    dct_param,
+    dct_target,
+    dct_guess=None,
+    k=None,
+    xmax=1024,
+    quantile=0.90,
+    max_passes=3,
+    parallel=True,
+    callback=None,
+    screen_model=None,
+    screen_margin=5,
+):
+    """
+    smallest N of several systems of one model meeting their target wait
+    times together, eg. for KIX_T1d
+    {"N_kiosk": 3, "N_security_lanes": 10, "N_emigration_counter": 10}
+
+    every run of the model gives the P90 (quantile) wait time of all the
+    systems: each round runs k - 1 vectors of N, the i-th candidate of
+    min_resource for every system still searched (the smallest N known to
+    meet the target for the others), so one round advances all the
+    brackets at once. Upstream systems change the flow reaching the
+    downstream ones: a run where a system misses its target only bounds
+    the N of the others from below, and when the brackets are closed the
+    final vector is run, the systems missing their target there reopening
+    their bracket from their current N (at most max_passes times)
+    dct_target: {variable_string: target wait time in minutes}
+    dct_guess: {variable_string: first N} (8 if missing)
+    callback: called after each round with (nit=, dct_bracket=, dct_runs=)
+    screen_model: fast estimate of model with the same arguments
+    (eg. simfunc.fluid.fluid_T1d), sized first, see min_resource screen
+    dct_param should not have a stop_condition: a run stopped early
+    does not tell which systems met their target
+    returns an OptimizeResult with x = {variable_string: N},
+    fun = {variable_string: P90 of the final run}, nsim the model runs
+    """
+    list_variable = list(dct_target)
+    dct_system = {
+        variable: variable.split("_", 1)[1] for variable in list_variable
+    }
+    dct_guess = dict(
+        {variable: 8 for variable in list_variable}, **(dct_guess or {})
+    )
+    if k is None:
+        k = 1 + max(1, int(ray.cluster_resources().get("CPU", 1)))
+    k = max(2, k)
+
+    def run(vector):
+        dct_run = dict(dct_param, **dict(zip(list_variable, vector)))
+        dct_run["df_Pax"] = dct_run["df_Pax"].copy()
+        _, _, dct_hist_wait_time, _ = model(**dct_run)
+        return {
+            variable: dct_hist_wait_time[dct_system[variable]].quantile(
+                q=quantile
+            )
+            for variable in list_variable
+        }
+
+    if parallel:
+        # adapt ray to function
+        @ray.remote
+        def f(vector):
+            return run(vector)
+
+    # {vector: {variable: P90}} and the P90 of each system against its N
+    dct_runs = {}
+    dct_values = {variable: {} for variable in list_variable}
+
+    if screen_model is not None:
+        # N clearly above the targets, and guess, with the screen model
+        dct_clear, dct_meet = [
+            min_resources(
+                screen_model,
+                dct_param,
+                {
+                    variable: target + margin
+                    for variable, target in dct_target.items()
+                },
+                dct_guess=dct_guess,
+                k=k,
+                xmax=xmax,
+                quantile=quantile,
+                parallel=False,
+            ).x
+            for margin in [screen_margin, 0]
+        ]
+        for variable in list_variable:
+            if (dct_clear[variable] or 0) > 1:
+                dct_values[variable][dct_clear[variable] - 1] = np.inf
+            if dct_meet[variable] is not None:
+                dct_guess[variable] = dct_meet[variable]
+
+    def evaluate(list_vector):
+        list_vector = [
+            vector
+            for vector in dict.fromkeys(list_vector)
+            if vector not in dct_runs
+        ]
+        if parallel:
+            list_kpi = ray.get([f.remote(vector) for vector in list_vector])
+        else:
+            list_kpi = [run(vector) for vector in list_vector]
+        for vector, dct_kpi in zip(list_vector, list_kpi):
+            dct_runs[vector] = dct_kpi
+            list_missed = [
+                variable
+                for variable in list_variable
+                if dct_kpi[variable] > dct_target[variable]
+            ]
+            for variable, x in zip(list_variable, vector):
+                # a system missing its target holds Pax back from the
+                # others: their wait times only bound the N from below
+                if dct_kpi[variable] <= dct_target[variable] and any(
+                    other != variable for other in list_missed
+                ):
+                    continue
+                dct_values[variable][x] = max(
+                    dct_kpi[variable], dct_values[variable].get(x, 0)
+                )
+        return len(list_vector)
+
+    niter = 0
+    npass = 0
+    success = False
+    while npass < max_passes:
+        npass += 1
+        # brackets of all the systems searched together
+        while True:
+            dct_bracket = {
+                variable: _bracket(dct_values[variable], dct_target[variable])
+                for variable in list_variable
+            }
+            dct_candidates = {
+                variable: _next_candidates(
+                    lower, upper, dct_guess[variable], k, xmax
+                )
+                for variable, (lower, upper) in dct_bracket.items()
+            }
+            n_run = max(len(list_x) for list_x in dct_candidates.values())
+            if n_run == 0:
+                break
+            niter += 1
+            list_vector = []
+            for i in range(n_run):
+                vector = []
+                for variable in list_variable:
+                    lower, upper = dct_bracket[variable]
+                    list_x = dct_candidates[variable]
+                    if i < len(list_x):
+                        vector.append(list_x[i])
+                    elif upper is not None:
+                        vector.append(upper)
+                    else:
+                        vector.append(min(xmax, max(list_x or [lower])))
+                list_vector.append(tuple(vector))
+            if not evaluate(list_vector):
+                break
+            if callback is not None:
+                callback(nit=niter, dct_bracket=dct_bracket, dct_runs=dct_runs)
+
+        if any(upper is None for _, upper in dct_bracket.values()):
+            break
+        # final vector: systems missing their target reopen their bracket
+        final = tuple(dct_bracket[variable][1] for variable in list_variable)
+        evaluate([final])
+        list_missed = [
+            variable
+            for variable in list_variable
+            if dct_runs[final][variable] > dct_target[variable]
+        ]
+        if not list_missed:
+            success = True
+            break
+        for variable in list_missed:
+            upper = dct_bracket[variable][1]
+            dct_values[variable] = {
+                x: y
+                for x, y in dct_values[variable].items()
+                if x > upper or y > dct_target[variable]
+            }
+
+    dct_x = {variable: upper for variable, (_, upper) in dct_bracket.items()}
+    return OptimizeResult(
+        x=dct_x,
+        fun=dct_runs.get(tuple(dct_x.values())),
+        nit=niter,
+        nfev=len(dct_runs),
+        nsim=len(dct_runs),
+        success=success,
+    )
+
+
+def bayesian_minimize(
+    fun,
+    bounds,
+    integer=None,
+    n_initial=None,
+    n_iter=5,
+    batch_size=None,
+    n_candidates=2000,
+    seed=12,
+    parallel=True,
+    callback=None,
+):
+    """
+    Bayesian optimization of fun over a box, for costs of several
+    continuous (or integer) variables where each evaluation is a
+    simulation, eg. cost_function_T1d_CUSBD_2var_modern_pax_ratio_
+    CUSBD_opening_duration with x = [CUSBD_opening_duration,
+    modern_pax_ratio] (fix the other arguments with functools.partial)
+
+    a Latin hypercube of n_initial points (batch_size if None) is
+    evaluated, then each round fits a Gaussian process to log(1 + cost)
+    and proposes batch_size points maximizing the expected improvement,
+    each one assuming the predicted cost at the previous ones (constant
+    liar), so the batch is spread; the batch is evaluated in parallel
+    bounds: [(min, max)] of each variable
+    integer: [bool] variables rounded to integers (all False if None)
+    batch_size: points per round (CPUs of ray if None)
+    n_candidates: random points scored by the expected improvement
+    callback: called after each round with (nit=, x=, fun=, x_iters=,
+    func_vals=)
+    returns an OptimizeResult with x, fun, and every evaluation in
+    x_iters, func_vals (n_initial + n_iter * batch_size evaluations at most)
+    """
+    # scikit-learn only needed here, the other optimizers run without it
+    from sklearn.gaussian_process import GaussianProcessRegressor
+    from sklearn.gaussian_process.kernels import (
+        ConstantKernel,
+        Matern,
+        WhiteKernel,
+    )
+
+    bounds = np.array(bounds, dtype=float)
+    n_dim = len(bounds)
+    integer = (
+        np.zeros(n_dim, dtype=bool)
+        if integer is None
+        else np.asarray(integer, dtype=bool)
+    )
+    if batch_size is None:
+        batch_size = max(1, int(ray.cluster_resources().get("CPU", 1)))
+    if n_initial is None:
+        n_initial = max(batch_size, 2 * n_dim + 1)
+    rng = np.random.default_rng(seed)
+
+    if parallel:
+        # adapt ray to function
+        @ray.remote
+        def f(x):
+            return fun(x)
+
+    def to_x(unit):
+        # [0, 1] -> bounds, integers rounded
+        x = bounds[:, 0] + unit * (bounds[:, 1] - bounds[:, 0])
+        return np.where(integer, np.round(x), x)
+
+    def to_unit(x):
+        return (x - bounds[:, 0]) / (bounds[:, 1] - bounds[:, 0])
+
+    list_x, list_y = [], []
+
+    def evaluate(array_unit):
+        array_x = [
+            x
+            for x in dict.fromkeys(tuple(to_x(unit)) for unit in array_unit)
+            if x not in set(map(tuple, list_x))
+        ]
+        if parallel:
+            list_y.extend(ray.get([f.remote(list(x)) for x in array_x]))
+        else:
+            list_y.extend(fun(list(x)) for x in array_x)
+        list_x.extend(np.array(x) for x in array_x)
+
+    # Latin hypercube: one point per row and column of an n_initial grid
+    array_unit = (
+        np.array([rng.permutation(n_initial) for _ in range(n_dim)]).T
+        + rng.random((n_initial, n_dim))
+    ) / n_initial
+    evaluate(array_unit)
+
+    kernel = ConstantKernel(1.0) * Matern(
+        length_scale=np.full(n_dim, 0.3),
+        length_scale_bounds=(1e-2, 10),
+        nu=2.5,
+    ) + WhiteKernel(1e-3, noise_level_bounds=(1e-8, 1))
+
+    for niter in range(1, n_iter + 1):
+        array_x = to_unit(np.array(list_x))
+        array_y = np.log1p(np.array(list_y, dtype=float))
+        gp = GaussianProcessRegressor(
+            kernel=kernel, normalize_y=True, random_state=seed
+        ).fit(array_x, array_y)
+
+        # candidates: uniform, and around the best points so far
+        list_best = array_x[np.argsort(array_y)[:3]]
+        candidates = np.clip(
+            np.vstack(
+                [rng.random((n_candidates, n_dim))]
+                + [
+                    best + rng.normal(0, 0.05, (n_candidates // 4, n_dim))
+                    for best in list_best
+                ]
+            ),
+            0,
+            1,
+        )
+
+        # batch: each proposal is assumed to cost its predicted value
+        batch = []
+        gp_liar, x_liar, y_liar = gp, array_x, array_y
+        for _ in range(batch_size):
+            mean, std = gp_liar.predict(candidates, return_std=True)
+            improvement = y_liar.min() - mean
+            z = improvement / np.maximum(std, 1e-12)
+            expected_improvement = improvement * st.norm.cdf(z) + std * (
+                st.norm.pdf(z)
+            )
+            best = candidates[np.argmax(expected_improvement)]
+            candidates = np.delete(
+                candidates, np.argmax(expected_improvement), axis=0
+            )
+            batch.append(best)
+            x_liar = np.vstack([x_liar, best])
+            y_liar = np.append(y_liar, gp_liar.predict(best[None, :]))
+            gp_liar = GaussianProcessRegressor(
+                kernel=gp.kernel_, normalize_y=True, optimizer=None
+            ).fit(x_liar, y_liar)
+
+        evaluate(np.array(batch))
+        index = int(np.argmin(list_y))
+        if callback is not None:
+            callback(
+                nit=niter,
+                x=list(list_x[index]),
+                fun=list_y[index],
+                x_iters=list_x,
+                func_vals=list_y,
+            )
+
+    index = int(np.argmin(list_y))
+    return OptimizeResult(
+        x=list(list_x[index]),
+        fun=list_y[index],
+        nit=n_iter,
+        nfev=len(list_y),
+        x_iters=[list(x) for x in list_x],
+        func_vals=list_y,
+        success=True,
+    )
+
+
+def grid_search(
+    fun,
+    dct_grid,
+    path=None,
+    name="grid_search",
+    N_core=None,
+    parallel=True,
+    callback=None,
+):
+    """
+    evaluate fun at every point of a grid, eg. for
+    cost_function_T1d_CUSBD_2var_modern_pax_ratio_CUSBD_opening_duration
+    dct_grid = {"CUSBD_opening_duration": [150, 185, ..., 360],
+                "modern_pax_ratio": [0.05, 0.24, ..., 0.99]}
+    fun is called with x = [value of each variable of dct_grid]
+
+    N_core points are run at once (ray, all its CPUs if None) and each
+    one is journaled as soon as it finishes: with a path, in a SQLite file
+    under name (see utils.journal), a search restarted with the same path
+    and name runs only the points missing, and
+    EvaluationJournal(None, path, name).to_frame(list(dct_grid)) reads the
+    results of a search still running (eg. in another notebook)
+    callback: called after each point with (x=, y=, df_grid=)
+    returns an OptimizeResult with x = {variable: value} of the lowest
+    cost, fun, nfev the points of the grid, nsim the points run (not in
+    the journal yet) and df_grid, every point of the journal with its y
+    """
+    list_variable = list(dct_grid)
+    journal = EvaluationJournal(fun, path=path, name=name)
+    list_x = [list(x) for x in itertools.product(*dct_grid.values())]
+    list_todo = [x for x in list_x if x not in journal]
+
+    def record(x, y):
+        journal.record(x, y)
+        if callback is not None:
+            callback(x=x, y=y, df_grid=journal.to_frame(list_variable))
+
+    if parallel:
+        # adapt ray to function
+        @ray.remote
+        def f(x):
+            return fun(x)
+
+        if N_core is None:
+            N_core = max(1, int(ray.cluster_resources().get("CPU", 1)))
+
+        dct_future = {}
+        try:
+            while list_todo or dct_future:
+                # keep every core busy
+                while list_todo and len(dct_future) < N_core:
+                    x = list_todo.pop(0)
+                    dct_future[f.remote(x)] = x
+                list_ready, _ = ray.wait(list(dct_future), num_returns=1)
+                for future in list_ready:
+                    record(dct_future.pop(future), ray.get(future))
+        finally:
+            # eg. a failed point: the ones journaled are kept
+            for future in dct_future:
+                ray.cancel(future)
+            journal.cancel(len(dct_future))
+    else:
+        for x in list_todo:
+            record(x, fun(x))
+
+    bestx = min(journal.values, key=journal.values.get)
+    return OptimizeResult(
+        x=dict(zip(list_variable, bestx)),
+        fun=journal.values[bestx],
+        nfev=len(list_x),
+        nsim=journal.executed + journal.recorded,
+        df_grid=journal.to_frame(list_variable),
+        success=True,
+    )
+
+
 def custcallback_multicore(
     all_x,
     all_y,
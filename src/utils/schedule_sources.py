@@ -0,0 +1,499 @@
+# schedule_sources.py
+# includes:
+# - load_forecast, peak_hour_table, select_forecast <- schedule forecast by FY
+# - load_schedule <- processed schedule (one sheet, several dates)
+# - ForecastSource <- flights of the FY fitting a target peak hour
+# - ScheduleFileSource <- flights of some dates of a processed schedule file
+# - DataFrameSource <- flights of a schedule already in memory
+# - show_up_pipeline <- df_Pax or df_Counters of any schedule source
+# - show_up_by_date <- df_Pax and df_Counters of many dates in one pass
+# - counter_rule <- parameters of the check-in counters allocation rule
+# - counter_seats <- seats per airline and 5 minutes of departures
+
+import numpy as np
+import pandas as pd
+
+from src.utils.cache import cached_frame, input_path, read_excel_cached
+from src.utils.counters import (
+    allocate_counters,
+    counters_to_dataframe,
+    seats_per_slot,
+)
+from src.utils.showup import (
+    PROFILE_SPECS,
+    flight_category,
+    generate_show_up,
+    show_up_inverse_cdf,
+    split_samples,
+)
+
+# keys of the peak hour table
+PEAK_HOUR_KEYS = ["FY", "A/D", "Day Of Week", "Int/Dom", "T1/T2(MM/9C/7C/TW)"]
+
+
+def load_forecast(path_forecasts, copy=True):
+    """
+    schedule forecast (sheet IntlP_FY19-FY25) with its Scheduled Time column
+    parsed and cached (see utils/cache.py), copy=False to only read it
+    """
+
+    def build():
+        # import the schedule from the excel file produced by Aero department
+        data = read_excel_cached(
+            path_forecasts,
+            sheet_name=r"IntlP_FY19-FY25",
+            header=0,
+        )
+
+        # format a Schedules time column to make a Timeserie later on
+        data["5min Interval"] = (
+            data["5min Interval"]
+            .astype(str)
+            .str.pad(width=4, side="left", fillchar="0")
+        )
+
+        data["Scheduled Time"] = "2020-10-13 " + data["5min Interval"].astype(
+            str
+        )
+        data["Scheduled Time"] = pd.to_datetime(data["Scheduled Time"])
+
+        data["Flight Number"] = data["Flight Number"].replace(
+            ["JX821"], "JX 821"
+        )
+        return data
+
+    return cached_frame(path_forecasts, "forecast", build, copy=copy)
+
+
+def peak_hour_table(path_forecasts, copy=True):
+    """
+    peak hour PAX of every (FY, A/D, Day Of Week, Int/Dom, terminal)
+    of the Passenger flights of the schedule forecast, cached with it
+
+    the peak hour is the highest sum of PAX over 60 consecutive minutes
+    between the first and the last flight of the day (NaN for less than an hour)
+    copy=False to only read it (see utils/cache.py)
+    """
+
+    def build():
+        data = load_forecast(path_forecasts, copy=False)
+        data = data[data["Category(P/C/O)"] == "Passenger"]
+        data = data.dropna(subset=PEAK_HOUR_KEYS)
+
+        # one row of PAX per minute of the day for each group
+        group = data.groupby(PEAK_HOUR_KEYS, sort=True).ngroup().to_numpy()
+        df_table = (
+            data[PEAK_HOUR_KEYS].drop_duplicates().sort_values(PEAK_HOUR_KEYS)
+        )
+        df_table = df_table.reset_index(drop=True)
+        n_group = len(df_table)
+        minute = (
+            data["Scheduled Time"].dt.hour * 60
+            + data["Scheduled Time"].dt.minute
+        ).to_numpy()
+        pax_per_minute = np.bincount(
+            group * 1440 + minute,
+            weights=data["PAX_SUM FC"].fillna(0).to_numpy(dtype=float),
+            minlength=n_group * 1440,
+        ).reshape(n_group, 1440)
+
+        # 60 minutes rolling sums from prefix sums, window starting at s
+        cumsum = np.zeros((n_group, 1441))
+        cumsum[:, 1:] = pax_per_minute.cumsum(axis=1)
+        rolling = cumsum[:, 60:] - cumsum[:, :-60]
+
+        # only complete windows between first and last flight
+        first = np.full(n_group, 1440)
+        last = np.full(n_group, -1)
+        np.minimum.at(first, group, minute)
+        np.maximum.at(last, group, minute)
+        start = np.arange(rolling.shape[1])
+        valid = (start >= first[:, None]) & (start + 59 <= last[:, None])
+        peak = np.where(valid, rolling, -np.inf).max(axis=1)
+        df_table["peak_hour"] = np.where(valid.any(axis=1), peak, np.nan)
+        return df_table
+
+    return cached_frame(path_forecasts, "peak_hour_table", build, copy=copy)
+
+
+def select_forecast(
+    target_peak=2900, direction="D", terminal="T1", path_forecasts=None
+):
+    """
+    flights of the FY of the forecast corresponding best to target_peak
+    (Saturday, international, Passenger flights of the terminal)
+
+    the FY is the one with the highest peak hour below target_peak,
+    or the lowest peak hour if target_peak is below all of them
+    returns the flights and the peak hour of the selected FY
+    """
+    if path_forecasts is None:
+        path_forecasts = input_path("schedule_forecast_FY19_25_path")
+
+    # import the schedule from the excel file produced by Aero department
+    # (read only: the flights of the FY selected below are a new frame)
+    data = load_forecast(path_forecasts, copy=False)
+
+    # peak hours of each FY, looked up in the precomputed table
+    FY_list = [i for i in range(2019, 2026)]
+    direction_list = ["STA", "STD"]
+
+    df_table = peak_hour_table(path_forecasts, copy=False)
+    df_table = df_table[
+        (df_table["Day Of Week"] == "Saturday")
+        & (df_table["Int/Dom"] == "I")
+        & (df_table["T1/T2(MM/9C/7C/TW)"] == terminal)
+    ]
+    df_peak = pd.DataFrame(index=FY_list, columns=direction_list)
+    for dir in direction_list:
+        peak_dir = df_table[df_table["A/D"] == dir[-1:]].set_index("FY")
+        df_peak[dir] = [
+            peak_dir["peak_hour"].get("FY{}".format(FY), np.nan)
+            for FY in FY_list
+        ]
+    df_peak.replace(0, np.nan, inplace=True)
+    # declare some constants (consider making it differently?)
+    sector = "I"
+    weekday = "Saturday"
+
+    # let's find the FY corresponding best to the target_peak
+    if target_peak < df_peak["ST{}".format(direction)].min():
+        FY = df_peak[
+            (
+                df_peak["ST{}".format(direction)]
+                == df_peak["ST{}".format(direction)].min()
+            )
+        ].index[0]
+        schedule_peak = df_peak["ST{}".format(direction)].min()
+    else:
+        maxmin_peak = max(
+            i for i in df_peak["ST{}".format(direction)] if i <= target_peak
+        )
+        FY = df_peak[(df_peak["ST{}".format(direction)] == maxmin_peak)].index[
+            0
+        ]
+        schedule_peak = maxmin_peak
+
+    # filter
+    filtered_data = data[
+        (
+            (data["A/D"] == direction)
+            & (data["Day Of Week"] == weekday)
+            & (data["Int/Dom"] == sector)
+            & (data["Category(P/C/O)"] == "Passenger")
+            & (data["T1/T2(MM/9C/7C/TW)"] == terminal)
+            & (data["FY"] == "FY{}".format(FY))
+        )
+    ]
+    filtered_data = filtered_data.reset_index()
+    return filtered_data, schedule_peak
+
+
+def format_schedule(data):
+    """
+    processed schedule with its Scheduled Time on the busy day (2020-10-13)
+    Scheduled Time can be times, strings (eg. "10:05:00") or datetimes
+    """
+    data = data.copy()
+    if pd.api.types.is_datetime64_any_dtype(data["Scheduled Time"]):
+        data["Scheduled Time"] = data["Scheduled Time"].dt.strftime("%H:%M:%S")
+
+    # format a Schedules time column to make a Timeserie later on
+    data["Scheduled Time"] = "2020-10-13 " + data["Scheduled Time"].astype(str)
+    data["Scheduled Time"] = pd.to_datetime(data["Scheduled Time"])
+
+    data["Flight Number"] = data["Flight Number"].replace(["JX821"], "JX 821")
+    return data
+
+
+def load_schedule(path_to_schedule):
+    """processed schedule (sheet schedule) formatted and cached"""
+    return cached_frame(
+        path_to_schedule,
+        "schedule",
+        lambda: format_schedule(
+            read_excel_cached(
+                path_to_schedule, sheet_name="schedule", header=0
+            )
+        ),
+    )
+
+
+def filter_schedule(
+    data, direction="D", terminal="T1", sector="I", date_str=None
+):
+    """
+    Passenger flights of a processed schedule
+    date_str: one date, a list of dates, or None for all dates
+    """
+    mask = (
+        (data["A/D"] == direction)
+        & (data["Sector"] == sector)
+        & (data["Category(P/C/O)"] == "P")
+        & (data["T1/T2(MM/9C/7C/TW)"] == terminal)
+    )
+    if date_str is not None:
+        if isinstance(date_str, (list, tuple, np.ndarray, pd.Index)):
+            mask &= data["Flight Date"].isin(pd.to_datetime(date_str))
+        else:
+            mask &= data["Flight Date"] == pd.Timestamp(date_str)
+    return data[mask].reset_index()
+
+
+class ForecastSource(object):
+    """
+    flights of the forecast FY corresponding best to target_peak,
+    Pax scaled by target_peak / schedule_peak (see select_forecast)
+    """
+
+    def __init__(self, target_peak=2900, path_forecasts=None):
+        self.target_peak = target_peak
+        self.path_forecasts = path_forecasts
+
+    def flights(self, direction="D", terminal="T1"):
+        """filtered flights, and factor applied to their PAX"""
+        filtered_data, schedule_peak = select_forecast(
+            target_peak=self.target_peak,
+            direction=direction,
+            terminal=terminal,
+            path_forecasts=self.path_forecasts,
+        )
+        return filtered_data, self.target_peak / schedule_peak
+
+
+class ScheduleFileSource(object):
+    """
+    flights of a processed schedule file (sheet schedule)
+    for one date, a list of dates or all dates (date_str=None)
+    """
+
+    def __init__(self, path_to_schedule, date_str="2017-03-19", sector="I"):
+        self.path_to_schedule = path_to_schedule
+        self.date_str = date_str
+        self.sector = sector
+
+    def schedule(self):
+        return load_schedule(self.path_to_schedule)
+
+    def flights(self, direction="D", terminal="T1"):
+        """filtered flights, and factor applied to their PAX"""
+        filtered_data = filter_schedule(
+            self.schedule(),
+            direction=direction,
+            terminal=terminal,
+            sector=self.sector,
+            date_str=self.date_str,
+        )
+        return filtered_data, 1
+
+
+class DataFrameSource(ScheduleFileSource):
+    """
+    flights of a schedule DataFrame in the processed schedule format
+    (eg. a modified copy of a schedule file, or a generated schedule)
+    """
+
+    def __init__(self, df_schedule, date_str=None, sector="I"):
+        self.df_schedule = format_schedule(df_schedule)
+        self.date_str = date_str
+        self.sector = sector
+
+    def schedule(self):
+        return self.df_schedule
+
+
+def show_up_pipeline(
+    source,
+    direction="D",
+    system="terminal",
+    ratio=1,
+    terminal="T1",
+    CTG_type="A",
+    custom_showup=False,
+    custom_counter_rule=False,
+    sampling="linspace",
+    seed=None,
+    n_samples=1,
+    continuous=False,
+    return_flights=False,
+    **kwargs,
+):
+    """
+    show-up of the Pax, or check-in counters, of the flights of `source`
+    (ForecastSource, ScheduleFileSource or DataFrameSource)
+    parameters and returns as show_up_function
+    continuous: absolute times over the dates of a schedule source
+    (see utils/showup.pax_dataframe and simfunc/horizon.py)
+    return_flights: also return the flights and the scale of their Pax
+    given by source.flights, so that callers do not filter the schedule
+    again, eg. (list_time_Pax, df_Pax, filtered_data, scale)
+    """
+    path_show_up = input_path("ADRM_param_full_path")
+
+    # import the airline_code
+    airline_code = read_excel_cached(
+        path_show_up,
+        sheet_name=r"airline_code",
+        header=0,
+    )
+
+    # if custom showup, assign the mean and STD of each profile
+    custom_profiles = None
+    if custom_showup == True:
+        custom_profiles = {
+            "FSC": (kwargs["loc_FSC"], kwargs["scale_FSC"]),
+            "LCC": (kwargs["loc_LCC"], kwargs["scale_LCC"]),
+            "CHINA": (kwargs["loc_CHINA"], kwargs["scale_CHINA"]),
+            "EARLY": (kwargs["loc_EARLY"], kwargs["scale_EARLY"]),
+        }
+
+    filtered_data, scale = source.flights(
+        direction=direction, terminal=terminal
+    )
+
+    # ====================================== Counters =====================================
+    if system == "check-in":
+        df_Counters = _counters(filtered_data, custom_counter_rule, **kwargs)
+        if return_flights:
+            return df_Counters, filtered_data, scale
+        return df_Counters
+
+    # ====================================== Show-up =====================================
+    # (terminal, security, CTG, boarding, arrivals)
+    if system not in PROFILE_SPECS:
+        raise ValueError("unknown system {}".format(system))
+
+    # number of Pax of each flight
+    n_pax = (
+        (filtered_data["PAX_SUM FC"] * ratio * scale).to_numpy().astype(int)
+    )
+
+    # inverse of the show-up profiles, compiled once per profile
+    inverse_cdf = show_up_inverse_cdf(
+        path_show_up,
+        system=system,
+        CTG_type=CTG_type,
+        custom_profiles=custom_profiles,
+    )
+
+    # let's allocate profiles to flight, one evaluation per category
+    list_time_Pax, df_Pax = generate_show_up(
+        filtered_data,
+        n_pax,
+        flight_category(filtered_data, airline_code, system),
+        inverse_cdf,
+        sampling=sampling,
+        seed=seed,
+        n_samples=n_samples,
+        continuous=continuous,
+    )
+    if return_flights:
+        return list_time_Pax, df_Pax, filtered_data, scale
+    return list_time_Pax, df_Pax
+
+
+def show_up_by_date(
+    source,
+    direction="D",
+    system="terminal",
+    ratio=1,
+    terminal="T1",
+    custom_counter_rule=False,
+    return_flights=False,
+    **kwargs,
+):
+    """
+    {date: (df_Pax, df_Counters)} for all the dates of a ScheduleFileSource
+    (or DataFrameSource); df_Counters is None for arrivals
+
+    the Pax of all dates are generated in one pass and split by date,
+    the same as one show_up_pipeline call per date; with n_samples > 1,
+    the df_Pax of each date keeps the sample column (see split_samples)
+    return_flights: returns (dct_date, flights of all the dates)
+    """
+    _, df_Pax, filtered_data, scale = show_up_pipeline(
+        source,
+        direction=direction,
+        system=system,
+        ratio=ratio,
+        terminal=terminal,
+        return_flights=True,
+        **kwargs,
+    )
+    n_pax = (
+        (filtered_data["PAX_SUM FC"] * ratio * scale).to_numpy().astype(int)
+    )
+    flight_date = filtered_data["Flight Date"].to_numpy()
+    date_pax = np.repeat(flight_date, n_pax)
+
+    # the Pax of each sample are in the order of the flights
+    if "sample" in df_Pax.columns:
+        list_sample = split_samples(df_Pax)
+    else:
+        list_sample = [df_Pax]
+
+    dct_date = {}
+    for date in pd.unique(flight_date):
+        list_date = [
+            df_sample[date_pax == date].reset_index(drop=True)
+            for df_sample in list_sample
+        ]
+        if len(list_date) > 1:
+            df_Pax_date = pd.concat(
+                [
+                    df_date.assign(sample=sample)
+                    for sample, df_date in enumerate(list_date)
+                ],
+                ignore_index=True,
+            )
+        else:
+            df_Pax_date = list_date[0]
+        df_Counters = None
+        if direction == "D":
+            df_Counters = _counters(
+                filtered_data[flight_date == date].reset_index(drop=True),
+                custom_counter_rule,
+                **kwargs,
+            )
+        dct_date[pd.Timestamp(date).strftime("%Y-%m-%d")] = (
+            df_Pax_date,
+            df_Counters,
+        )
+    if return_flights:
+        return dct_date, filtered_data
+    return dct_date
+
+
+def counter_rule(custom_counter_rule=False, **kwargs):
+    """parameters of allocate_counters, default or custom (kwargs)"""
+    rule = {
+        "start_time": 2.5,  # hours before STD for check-in opening
+        "onecounter_time": 0.75,  # hours before STD with only one counter
+        "base_n_counter": 4,
+        "seats_per_add_counter": 60,
+    }
+
+    # in case we change checkin counter allocation rule
+    if custom_counter_rule == True:
+        rule = {key: kwargs[key] for key in rule}
+    return rule
+
+
+def counter_seats(data):
+    """seats_per_slot of the departures data, flight numbers fixed"""
+    # NEW fix some input mistakes
+    data["Flight Number"] = data["Flight Number"].replace(["JX821"], "JX 821")
+    data["Flight Number"] = data["Flight Number"].replace(
+        ["NS*****"], "NS *****"
+    )
+    return seats_per_slot(data)
+
+
+def _counters(data, custom_counter_rule=False, **kwargs):
+    """df_Counters of the departures data (see utils/counters.py)"""
+    # seats of each airline per 5 minutes, then apply the rule
+    list_airline, array_seats = counter_seats(data)
+    array_counters = allocate_counters(
+        array_seats, **counter_rule(custom_counter_rule, **kwargs)
+    )
+    return counters_to_dataframe(list_airline, array_counters)
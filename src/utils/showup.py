@@ -0,0 +1,386 @@
+# showup.py
+# includes:
+# - flight_category <- show-up profile category of each flight
+# - show_up_quantiles <- quantiles of the Pax of all flights in one array
+#   (linspace, random or stratified)
+# - minutes_to_datetime <- minutes (float) to datetime64 of the busy day
+# - generate_show_up <- show-up time of every Pax of a filtered schedule
+# - split_samples <- one df_Pax per sample of a bulk generation
+# - show_up_minutes, pax_dataframe <- steps of generate_show_up
+#   (times folded on the busy day, or continuous over several days)
+# - InverseCDF <- inverse of a piecewise linear show-up profile
+# - show_up_inverse_cdf <- compiled InverseCDF of each category of a system
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy.interpolate import interp1d
+from scipy.stats import norm
+
+from src.utils.cache import file_signature, read_excel_cached
+
+# show-up profiles of each system in the ADRM parameters file:
+# sheet, header, number of rows to drop, time column,
+# {category: (profile, number of knots kept for the inverse)}
+# as before, FSC flights get the LCC profile and LCC flights the FSC one
+PROFILE_SPECS = {
+    "terminal": (
+        "terminal",
+        1,
+        2,
+        "time before STD",
+        {
+            "EARLY": ("EARLY", None),
+            "China": ("CHINA", None),
+            "FSC": ("LCC", None),
+            "LCC": ("FSC", None),
+        },
+    ),
+    "security": (
+        "PRS",
+        1,
+        2,
+        "time before STD",
+        {
+            "EARLY": ("EARLY", None),
+            "MORNING": ("MORNING", None),
+            "China": ("CHINA", None),
+            "FSC": ("LCC", None),
+            "LCC": ("FSC", None),
+        },
+    ),
+    "CTG": (
+        "CTG",
+        1,
+        3,
+        "time before STD",
+        {
+            "code C": ("code C type {CTG_type}", None),
+            "code E": ("code E type {CTG_type}", None),
+        },
+    ),
+    "boarding": (
+        "boarding",
+        0,
+        0,
+        "time before STD",
+        {"code C": ("code C", 10), "code E": ("code E", 12)},
+    ),
+    "arrivals": (
+        "deboarding",
+        1,
+        0,
+        "time after STA",
+        {"code C": ("code C", 3), "code E": ("code E", 4)},
+    ),
+}
+
+
+def flight_category(filtered_data, airline_code, system="terminal"):
+    """
+    category of the show-up profile applied to each flight of filtered_data
+
+    terminal: EARLY (STD 2:00-8:00), China, FSC, LCC
+    security: EARLY, MORNING (STD 8:00-12:00), China, FSC, LCC
+    CTG, boarding and arrivals: code C (narrow body) or code E
+    """
+    scheduled_time = filtered_data["Scheduled Time"]
+
+    if system in ["terminal", "security"]:
+        list_FSC = airline_code[airline_code["FSC / LCC"] == "FSC"][
+            "airline code"
+        ].to_numpy(dtype="str")
+
+        conditions = [
+            (scheduled_time < pd.to_datetime("2020-10-13 08:00:00"))
+            & (scheduled_time >= pd.to_datetime("2020-10-13 02:00:00"))
+        ]
+        choices = ["EARLY"]
+        if system == "security":
+            conditions.append(
+                (scheduled_time < pd.to_datetime("2020-10-13 12:00:00"))
+                & (scheduled_time >= pd.to_datetime("2020-10-13 08:00:00"))
+            )
+            choices.append("MORNING")
+        conditions += [
+            filtered_data["Intl Regions"] == "China",
+            filtered_data["Flight Number"].str[0:2].isin(list_FSC),
+        ]
+        choices += ["China", "FSC"]
+        default = "LCC"
+
+    else:
+        conditions = [filtered_data["Aircraft_Narrow/Wide"] == "Narrow body"]
+        choices = ["code C"]
+        default = "code E"
+
+    return np.select(
+        [np.asarray(condition, dtype=bool) for condition in conditions],
+        choices,
+        default=default,
+    ).astype(object)
+
+
+def show_up_quantiles(
+    n_pax, start=0.0001, stop=0.995, sampling="linspace", rng=None
+):
+    """
+    show-up quantiles of the Pax of all flights in one array
+
+    sampling:
+        - "linspace": np.linspace(start, stop, N) for N in n_pax,
+          bit for bit identical to the per flight calls (default)
+        - "random": N uniform draws between start and stop
+        - "stratified": one uniform draw in each of the N equal strata
+          between start and stop
+    rng: numpy.random.Generator (or seed) for the random samplings
+    returns the quantiles and the index of the flight of each of them
+    """
+    n_pax = np.asarray(n_pax, dtype=int)
+    flight_index = np.repeat(np.arange(len(n_pax)), n_pax)
+    first = np.cumsum(n_pax) - n_pax
+
+    # position of each Pax in its flight
+    k = (np.arange(len(flight_index)) - first[flight_index]).astype(float)
+
+    if sampling == "linspace":
+        # step of each flight's linspace
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = (stop - start) / (n_pax - 1)
+        y = k * step[flight_index] + start
+
+        # np.linspace returns exactly `stop` as last value (when N > 1)
+        y[(first + n_pax - 1)[n_pax > 1]] = stop
+        # and exactly `start` when N == 1
+        y[first[n_pax == 1]] = start
+
+    elif sampling in ["random", "stratified"]:
+        rng = np.random.default_rng(rng)
+        u = rng.random(len(flight_index))
+        if sampling == "random":
+            y = start + u * (stop - start)
+        else:
+            y = start + (k + u) * (stop - start) / n_pax[flight_index]
+
+    else:
+        raise ValueError(
+            "sampling should be linspace, random or stratified, "
+            "not {}".format(sampling)
+        )
+
+    return y, flight_index
+
+
+def minutes_to_datetime(minutes, day="2020-10-13"):
+    """
+    datetime64 array of minutes folded on `day`, truncated to the second
+    like datetime.datetime(hour=int(t % 1440 / 60), minute=int(t % 60),
+    second=int(t % 1 * 60))
+    """
+    minutes = np.asarray(minutes, dtype=float)
+    seconds = (
+        np.trunc(np.mod(minutes, 24 * 60) / 60) * 3600
+        + np.trunc(np.mod(minutes, 60)) * 60
+        + np.trunc(np.mod(minutes, 1) * 60)
+    )
+    return np.datetime64(day, "s") + seconds.astype("timedelta64[s]")
+
+
+def generate_show_up(
+    filtered_data,
+    n_pax,
+    category,
+    inverse_cdf,
+    sampling="linspace",
+    seed=None,
+    n_samples=1,
+    continuous=False,
+):
+    """
+    show-up time of each Pax of filtered_data
+
+    n_pax: number of Pax of each flight
+    category: category of each flight (see flight_category)
+    inverse_cdf: {category: function of the quantile giving the minutes
+    before the scheduled time}
+    sampling, seed: quantiles of the Pax (see show_up_quantiles)
+    n_samples: number of days drawn at once; if more than 1,
+    df_Pax gets a "sample" column (see split_samples)
+    continuous: absolute times from the "Flight Date" of each flight
+    instead of times folded on the busy day (see pax_dataframe)
+
+    each inverse function is evaluated once over the quantiles
+    of all the flights (and samples) of its category
+    returns list_time_Pax, df_Pax like show_up_function
+    """
+    n_flight = len(filtered_data)
+    y, index = show_up_quantiles(
+        np.tile(np.asarray(n_pax, dtype=int), n_samples),
+        sampling=sampling,
+        rng=seed,
+    )
+    sample, flight_index = np.divmod(index, max(n_flight, 1))
+
+    category = np.asarray(category, dtype=object)
+    minutes = show_up_minutes(
+        scheduled_minutes(filtered_data)[flight_index],
+        category[flight_index],
+        y,
+        inverse_cdf,
+    )
+    df_Pax = pax_dataframe(
+        filtered_data, category, flight_index, minutes, continuous=continuous
+    )
+    if n_samples > 1:
+        df_Pax["sample"] = sample
+    list_time_Pax = list(df_Pax["time"].dt.to_pydatetime())
+    return list_time_Pax, df_Pax
+
+
+def scheduled_minutes(filtered_data):
+    """minutes of the day of the Scheduled Time of each flight"""
+    scheduled_time = pd.to_datetime(filtered_data["Scheduled Time"])
+    return (
+        scheduled_time.dt.hour * 60 + scheduled_time.dt.minute
+    ).to_numpy()
+
+
+def show_up_minutes(scheduled_minutes_pax, category_pax, y, inverse_cdf):
+    """
+    show-up time of each Pax in minutes (not folded on the day)
+    from the scheduled time and category of its flight and its quantile y
+    each inverse function is evaluated once for all Pax of its category
+    """
+    time_before = np.empty(len(y))
+    for cat in np.unique(category_pax):
+        mask = category_pax == cat
+        time_before[mask] = inverse_cdf[cat](y[mask])
+    return scheduled_minutes_pax - time_before
+
+
+def pax_dataframe(
+    filtered_data, category, flight_index, minutes, continuous=False
+):
+    """
+    df_Pax of the Pax of the flights flight_index showing up at minutes
+    continuous: times and Scheduled Time on the Flight Date of each flight,
+    not folded (eg. the evening before for flights after midnight)
+    """
+    scheduled_time = pd.to_datetime(filtered_data["Scheduled Time"])
+    if continuous:
+        flight_date = pd.to_datetime(
+            filtered_data["Flight Date"]
+        ).dt.normalize()
+        time = flight_date.to_numpy()[flight_index] + np.floor(
+            np.asarray(minutes, dtype=float) * 60
+        ).astype("timedelta64[s]")
+        scheduled_time = flight_date + (
+            scheduled_time - scheduled_time.dt.normalize()
+        )
+    else:
+        time = minutes_to_datetime(minutes)
+    return pd.DataFrame(
+        {
+            "Flight Number": filtered_data["Flight Number"].to_numpy()[
+                flight_index
+            ],
+            "time": pd.to_datetime(time),
+            "Scheduled Time": scheduled_time.to_numpy()[flight_index],
+            "Category": np.asarray(category, dtype=object)[flight_index],
+        }
+    )
+
+
+def split_samples(df_Pax):
+    """list of the df_Pax of each sample of a multi-sample df_Pax"""
+    return [
+        df_sample.drop(columns="sample").reset_index(drop=True)
+        for _, df_sample in df_Pax.groupby("sample", sort=True)
+    ]
+
+
+class InverseCDF(object):
+    """
+    inverse of a piecewise linear cumulative show-up profile
+
+    compiled once from the knots (cumulative value, time) of the profile,
+    sorted like interp1d does, and sampled with np.interp:
+    same values as interp1d(f(x), x, kind="linear"), including the
+    ValueError for quantiles out of the profile range
+    """
+
+    def __init__(self, cumulative, time):
+        order = np.argsort(cumulative, kind="mergesort")
+        self.cumulative = np.asarray(cumulative, dtype=float)[order]
+        self.time = np.asarray(time, dtype=float)[order]
+
+    def __call__(self, quantile):
+        quantile = np.asarray(quantile, dtype=float)
+        if np.any(quantile < self.cumulative[0]):
+            raise ValueError(
+                "A value in x_new is below the interpolation range."
+            )
+        if np.any(quantile > self.cumulative[-1]):
+            raise ValueError(
+                "A value in x_new is above the interpolation range."
+            )
+        return np.interp(quantile, self.cumulative, self.time)
+
+
+def show_up_inverse_cdf(
+    path_show_up, system="terminal", CTG_type="A", custom_profiles=None
+):
+    """
+    {category: InverseCDF} of the show-up profiles of `system`
+    (categories of flight_category)
+
+    custom_profiles: {profile: (loc, scale)} replaces the profiles of the
+    terminal by 1 - norm.cdf (eg. {"FSC": (loc_FSC, scale_FSC), ...})
+
+    each profile is compiled once per version of the ADRM file,
+    and each custom profile once per (loc, scale)
+    """
+    sheet_name, header, n_drop, time_column, dct_category = PROFILE_SPECS[
+        system
+    ]
+    signature = file_signature(path_show_up)
+
+    dct_inverse_cdf = {}
+    for category, (profile, n_knots) in dct_category.items():
+        profile = profile.format(CTG_type=CTG_type)
+        if custom_profiles is not None and system == "terminal":
+            loc, scale = custom_profiles[profile]
+            dct_inverse_cdf[category] = _normal_inverse_cdf(
+                signature, path_show_up, system, loc, scale
+            )
+        else:
+            dct_inverse_cdf[category] = _profile_inverse_cdf(
+                signature, path_show_up, system, profile, n_knots
+            )
+    return dct_inverse_cdf
+
+
+def _profile_time(path_show_up, system):
+    sheet_name, header, n_drop, time_column, _ = PROFILE_SPECS[system]
+    show_up = read_excel_cached(
+        path_show_up, sheet_name=sheet_name, header=header
+    )
+    show_up = show_up.iloc[n_drop:].reset_index(drop=True)
+    return show_up, show_up[time_column].to_numpy(dtype=float)
+
+
+@lru_cache(maxsize=None)
+def _profile_inverse_cdf(signature, path_show_up, system, profile, n_knots):
+    show_up, x = _profile_time(path_show_up, system)
+    y = show_up["cumulative distribution {}".format(profile)].to_numpy(
+        dtype=float
+    )
+    f = interp1d(x, y, kind="linear")
+    return InverseCDF(f(x)[0:n_knots], x[0:n_knots])
+
+
+@lru_cache(maxsize=1024)
+def _normal_inverse_cdf(signature, path_show_up, system, loc, scale):
+    _, x = _profile_time(path_show_up, system)
+    return InverseCDF(1 - norm.cdf(x, loc=loc, scale=scale), x)